@@ -11,29 +11,107 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-import mathutils
+import bpy
+import numpy as np
 
 from .mesh_helpers import *
 from .grease_pencil_helpers import *
+from .wire_core import *
+
+class AnnotateSelectCacheEntry():
+    """アノテートから選択する際の頂点の検索用データ
+    """
+    def __init__(self, key, mesh_name, coord_hash, coords, edges):
+        # メッシュ・頂点数・辺の数・ワールド行列
+        self.key = key
+        # 対象のメッシュ名（メッシュ側の更新通知を対象に結びつけるため）
+        self.mesh_name = mesh_name
+        # 頂点座標・辺のハッシュ（更新の通知があった場合のみ確認する）
+        self.coord_hash = coord_hash
+        # ワールド座標の頂点 (V, 3) と辺 (E, 2)
+        self.coords = coords
+        self.edges = edges
+        # 近傍点の検索用の格子（許容誤差ごとに作成する）
+        self.point_grid = None
+        self.tolerance = None
+        # 形状の更新の通知があったか
+        self.is_dirty = False
+
+class AnnotateSelectCache():
+    """アノテートごとに検索用データを作り直さないよう、オブジェクトごとに保持する
+    """
+    entries = {}
+
+    @classmethod
+    def get_key(self, obj, bm):
+        return (
+            obj.data.as_pointer(),
+            len(bm.verts),
+            len(bm.edges),
+            tuple(tuple(row) for row in obj.matrix_world),
+        )
+
+    @classmethod
+    def get_entry(self, obj, bm, tolerance):
+        key = self.get_key(obj, bm)
+        entry = self.entries.get(obj.name)
+        if entry is None or entry.key != key or entry.is_dirty:
+            # 更新の通知があっても、選択の変更のみであれば座標・辺は変わらないため作り直さない
+            coords = bmesh_coord_array(bm)
+            edges = bmesh_edge_array(bm)
+            coord_hash = hash((coords.tobytes(), edges.tobytes()))
+            if entry is not None and entry.key == key and entry.coord_hash == coord_hash:
+                entry.is_dirty = False
+            else:
+                entry = AnnotateSelectCacheEntry(key, obj.data.name, coord_hash, get_transformed_coords(coords, obj.matrix_world), edges)
+                self.entries[obj.name] = entry
+
+        if entry.point_grid is None or entry.tolerance != tolerance:
+            # 許容誤差が0の場合も格子の大きさは0にできないため、わずかな大きさにする
+            entry.point_grid = build_point_grid(entry.coords, max(tolerance, 1e-6))
+            entry.tolerance = tolerance
+        return entry
+
+    @classmethod
+    def on_depsgraph_update(self, depsgraph):
+        if not self.entries:
+            return
+
+        # 選択の反映による通知も無効にし、作り直すかは座標のハッシュで確認する
+        for update in depsgraph.updates:
+            if not update.is_updated_geometry:
+                continue
+            # 評価後のIDで通知されるため、元のIDで対象を探す
+            id = update.id.original
+            if isinstance(id, bpy.types.Object):
+                names = [id.name]
+            elif isinstance(id, bpy.types.Mesh):
+                names = [name for name, entry in self.entries.items() if entry.mesh_name == id.name]
+            else:
+                continue
+            for name in names:
+                entry = self.entries.get(name)
+                if entry is not None:
+                    entry.is_dirty = True
+
+    @classmethod
+    def clear(self):
+        self.entries.clear()
+
+    @classmethod
+    def unregister(self):
+        self.clear()
 
 class Annotate():
     annotate_name = "__Annotate__"
     # annotate_layer = {}
 
     @classmethod
-    def get_selected_edge_coords(self, bm, obj):
-        selected_edge_coords = []
-        edges = [e for e in bm.edges if e.select]
-        for e in edges:
-            v_1 = e.verts[0]
-            v_2 = e.verts[1]
-            # n_1 = v_1.normal.copy()
-            # n_2 = v_2.normal.copy()
-            co_1 = obj.matrix_world @ v_1.co.copy()
-            co_2 = obj.matrix_world @ v_2.co.copy()
-            selected_edge_coords.append((co_1, co_2))
-            # selected_edge_coords.append(((co_1, n_1, v_1.index), (co_2, n_2, v_2.index)))
-        return selected_edge_coords
+    def get_selected_edge_coords(self, obj):
+        """選択した辺の両端をワールド座標で取得する（戻り値は (N, 2, 3)）
+        """
+        coords, edges = selected_edge_arrays(obj)
+        return get_edge_coords(coords, edges, obj.matrix_world)
 
     @classmethod
     def init_annotate_layer(self, context, color, hide, opacity, index = -1):
@@ -80,10 +158,8 @@ class Annotate():
             return
         gp = context.scene.grease_pencil
         if gp is not None:
-            for layer in list(gp.layers) :
-                if self.get_annotate_name(index) in layer.info :
-                    annotate_layer.hide = True
-                    gp.layers.remove(layer)
+            annotate_layer.hide = True
+            remove_gp_layer(gp, annotate_layer)
 
     @classmethod
     def get_annotate_name(self, index = -1):
@@ -100,50 +176,59 @@ class Annotate():
         if annotate_layer is None:
             return
         frame = get_gp_frame(annotate_layer)
-        for e in selected_edge_coords :
+        # つながった辺は1つのストロークにまとめ、座標はまとめて書き込む
+        for chain in get_edge_chains(selected_edge_coords) :
             stroke = frame.strokes.new()
-            stroke.points.add(1)
-            stroke.points[-1].co = e[0]
-            # stroke.points[-1].co = e[0][0]
-            stroke.points.add(1)
-            stroke.points[-1].co = e[1]
-            # stroke.points[-1].co = e[1][0]
+            stroke.points.add(len(chain))
+            stroke.points.foreach_set("co", chain.ravel())
             stroke.points.update()
 
     @classmethod
-    def annotate_to_select(self, context, index = -1):
+    def get_stroke_coords(self, strokes):
+        """ストロークごとの点の座標 (K, 3) の一覧を取得する
+        """
+        stroke_coords = []
+        for stroke in strokes:
+            coords = np.empty(len(stroke.points) * 3, dtype = np.float32)
+            stroke.points.foreach_get("co", coords)
+            stroke_coords.append(coords.reshape(-1, 3))
+        return stroke_coords
+
+    @classmethod
+    def annotate_to_select(self, context, index = -1, tolerance = 0.0001):
         annotate_layer = self.get_annotate_layer(context, index)
         if annotate_layer is None:
             return
         frame = get_gp_frame(annotate_layer)
-        strokes = frame.strokes
-        co_list = []
-        for i, _stroke in enumerate(strokes):
-            stroke_points = strokes[i].points
-            for point in stroke_points :
-                co_list.append((point.co.x, point.co.y, point.co.z))
-
-        if co_list :
-            obj = bpy.context.edit_object
-            bm = bmesh_from_object(obj)
-            bm.verts.ensure_lookup_table()
-            size = len(bm.verts)
-            kd = mathutils.kdtree.KDTree(size)
-
-            for i, v in enumerate(bm.verts):
-                kd.insert(obj.matrix_world @ v.co.copy(), i)
-            
-            kd.balance()
-
-            for co in co_list :
-                co_find = co
-                co, v_index, dist = kd.find(co_find)
-                # 完全一致である場合のみ選択する
-                if 0 == dist :
-                    bm.verts[v_index].select = True
-
-            bmesh.update_edit_mesh(obj.data)
-            bm.select_flush(True)
+        stroke_coords = [coords for coords in self.get_stroke_coords(frame.strokes) if len(coords) > 0]
+        if not stroke_coords:
+            return
+
+        obj = bpy.context.edit_object
+        bm = bmesh_from_object(obj)
+        bm.verts.ensure_lookup_table()
+        bm.edges.ensure_lookup_table()
+        # 形状・変形が変わっていなければ前回の検索用データを使いまわす
+        entry = AnnotateSelectCache.get_entry(obj, bm, tolerance)
+
+        # すべての点をまとめて、許容誤差以内で最も近い頂点を求める
+        nearest = find_nearest_points(entry.coords, entry.point_grid, np.concatenate(stroke_coords), tolerance)
+
+        # ストロークの隣り合う点がどちらも頂点に一致した場合、その間の辺を選択する
+        lengths = np.array([len(coords) for coords in stroke_coords])
+        is_last = np.zeros(len(nearest), dtype = bool)
+        is_last[np.cumsum(lengths) - 1] = True
+        pairs = np.stack([nearest[:-1], nearest[1:]], axis = -1)
+        pairs = pairs[~is_last[:-1] & (pairs[:, 0] >= 0) & (pairs[:, 1] >= 0)]
+        edge_index = find_edges(entry.edges, pairs, len(entry.coords))
+
+        for v_index in np.unique(nearest[nearest >= 0]).tolist():
+            bm.verts[v_index].select_set(True)
+        for e_index in np.unique(edge_index[edge_index >= 0]).tolist():
+            bm.edges[e_index].select_set(True)
+
+        bm.select_flush_mode()
+        bmesh.update_edit_mesh(obj.data)
 
     # @classmethod
     # def toggle_annotate_view(self, index = -1):
@@ -26,22 +26,38 @@ bl_info = {
 
 import bpy
 import gpu
-import bgl
 import math
 import random
 
+from time import perf_counter
+
 from bpy.types import Operator, Panel, UIList, PropertyGroup
-from bpy.props import IntProperty, FloatProperty, FloatVectorProperty, BoolProperty, PointerProperty, CollectionProperty
-from gpu_extras.batch import batch_for_shader
+from bpy.props import IntProperty, FloatProperty, FloatVectorProperty, BoolProperty, EnumProperty, PointerProperty, CollectionProperty
 from .helper import *
 from .mesh_helpers import *
 from .Annotate import *
+from .wire_cache import *
+from .wire_renderer import *
+from .wire_hud import *
 
 # Updater ops import, all setup in this file.
 from . import addon_updater_ops
 
 def update_cw_target(self, context):
-    ConfirmWireOperator.force_disable()
+    # 描画を止めずに、対象から外れたオブジェクトのキャッシュのみ破棄する
+    WireCache.retain([obj.name for obj, _ in ConfirmWireOperator.get_targets(context)])
+    area_3d_view_tag_redraw_all()
+
+def update_cw_hud(self, context):
+    area_3d_view_tag_redraw_all()
+
+# 視点の移動が止まったとみなすまでの時間（秒）
+CW_SETTLE_INTERVAL = 0.15
+
+# 視点の移動が止まった後に前後判定をやり直すための再描画
+def confirm_wire_settle_timer():
+    area_3d_view_tag_redraw_windows()
+    return None
 
 class ConfirmWirePropertyGroup(PropertyGroup):
 
@@ -59,10 +75,38 @@ class ConfirmWirePropertyGroup(PropertyGroup):
     cw_is_modifier : BoolProperty(name = "modifier", default = False)
     # 隠れた線も表示するか
     cw_is_xray : BoolProperty(name = "xray", default = False)
+    # 前後判定をCPUで行うかGPU（シェーダー）で行うか
+    cw_facing_mode : EnumProperty(
+        name = "facing",
+        items = [
+            ('CPU', "CPU", "classify edges on the CPU whenever the view changes"),
+            ('GPU', "GPU", "classify edges in a shader, geometry is uploaded only when the mesh changes"),
+        ],
+        default = 'CPU')
     # 処理可能な頂点数
-    cw_max_vertex : IntProperty(name = "max vertex", default = 100000, min = 10000, max = 200000)
+    cw_max_vertex : IntProperty(name = "max vertex", default = 100000, min = 10000, max = 10000000)
+    # 辺を間引いて描画するか（処理可能な頂点数を超えた場合は、有効でも中止する）
+    cw_is_lod : BoolProperty(name = "lod", default = False)
+    # 間引かずに描画する辺の数（超える場合は、視点の移動中はこの数まで間引いて描画する）
+    cw_lod_budget : IntProperty(name = "lod budget", default = 100000, min = 1000, max = 10000000)
+    # 視点が止まった後、1回の描画で追加する辺の数
+    cw_lod_step : IntProperty(name = "lod step", default = 100000, min = 1000, max = 10000000)
+    # 辺を増やす上限
+    cw_lod_limit : IntProperty(name = "lod limit", default = 1000000, min = 1000, max = 10000000)
+    # 視錐台の外にある辺を描画しないか（CPUで前後判定する場合のみ）
+    cw_is_culling : BoolProperty(name = "culling", default = False)
+    # 前後判定に時間がかかる場合、視点の移動中は前回の判定結果を描画するか（CPUで前後判定する場合のみ）
+    cw_is_adaptive : BoolProperty(name = "adaptive", default = False)
+    # 前後判定にかけてよい時間（ミリ秒、これを超えた場合に移動中の判定を間引く）
+    cw_frame_budget : FloatProperty(name = "frame budget (ms)", default = 8.0, min = 1.0, max = 100.0, precision = 1)
+    # 移動中に前後判定をやり直す1秒あたりの上限
+    cw_rebuild_rate : IntProperty(name = "rebuild rate", default = 5, min = 1, max = 60)
+    # 処理時間・頂点数などを3DVIEWに表示するか
+    cw_is_hud : BoolProperty(name = "hud", default = False, update = update_cw_hud)
     # 作成可能なアノテート
     cw_max_annotate : IntProperty(name = "max annotate", default = 10, min = 10, max = 40)
+    # アノテートから選択する際、頂点と一致したとみなす距離（大きいほど検索する組み合わせが増えるため上限を低くする）
+    cw_select_tolerance : FloatProperty(name = "select tolerance", default = 0.0001, min = 0.0, soft_max = 0.01, max = 0.1, precision = 5, subtype = 'DISTANCE')
 
 def update_hide(self, context):
     Annotate.set_annotate_layer_hide(context, self.hide, self.index)
@@ -93,12 +137,20 @@ class ConfirmWireAnnotateListPropertyGroup(PropertyGroup) :
     color: FloatVectorProperty(name = 'color', subtype = 'COLOR', min = 0.0, max = 1, default = (0.0, 1.0, 0.0), precision = 1, update = update_color)
     opacity: BoolProperty(name = "opacity", default = False, update = update_opacity)
 
+class ConfirmWireTargetListPropertyGroup(PropertyGroup) :
+    target: PointerProperty(name = "target", type = bpy.types.Object, poll = lambda self, obj: obj.type == 'MESH', update = update_cw_target)
+    hide: BoolProperty(name = "hide", default = False, update = update_cw_target)
+    line_alpha: FloatProperty(name = "alpha", default = 0.5, min = 0, max = 1, precision = 1)
+    line_color: FloatVectorProperty(name = 'color', subtype = 'COLOR', min = 0.0, max = 1, default = (0.0, 1.0, 0.0), precision = 1)
+
 class ConfirmWireOperator(Operator):
     bl_idname = "confirm_wire.operator"
     bl_label = "Confirm Wire"
 
     # 描画ハンドラ
     draw_handler = None
+    # HUDの描画ハンドラ
+    hud_handler = None
 
     @classmethod
     def is_enable(self):
@@ -108,80 +160,250 @@ class ConfirmWireOperator(Operator):
     @classmethod
     def force_disable(self):
         bpy.types.SpaceView3D.draw_handler_remove(self.draw_handler, 'WINDOW')
+        bpy.types.SpaceView3D.draw_handler_remove(self.hud_handler, 'WINDOW')
         self.draw_handler = None
+        self.hud_handler = None
+        WireCache.clear()
+        WireHud.clear()
         area_3d_view_tag_redraw_all()
 
     @classmethod
     def __handle_add(self, context):
         self.draw_handler = bpy.types.SpaceView3D.draw_handler_add(self.__draw, (context, ), 'WINDOW', 'POST_VIEW')
+        self.hud_handler = bpy.types.SpaceView3D.draw_handler_add(self.__draw_hud, (context, ), 'WINDOW', 'POST_PIXEL')
 
     @classmethod
     def __handle_remove(self, context):
         bpy.types.SpaceView3D.draw_handler_remove(self.draw_handler, 'WINDOW')
+        bpy.types.SpaceView3D.draw_handler_remove(self.hud_handler, 'WINDOW')
         self.draw_handler = None
+        self.hud_handler = None
+        WireCache.clear()
+        WireHud.clear()
+
+    @classmethod
+    def get_targets(self, context):
+        """描画対象のオブジェクトと線の色の一覧を取得する
+        """
+        prop = context.scene.confirm_wire_prop
+        targets = []
+        if prop.cw_target is not None:
+            rgb = prop.cw_line_color
+            targets.append((prop.cw_target, (rgb[0], rgb[1], rgb[2], prop.cw_line_alpha)))
+
+        for item in context.scene.confirm_wire_target_collection:
+            if item.target is None or item.hide:
+                continue
+            # 同じオブジェクトは一度だけ描画する
+            if any(item.target == obj for obj, _ in targets):
+                continue
+            rgb = item.line_color
+            targets.append((item.target, (rgb[0], rgb[1], rgb[2], item.line_alpha)))
+        return targets
 
     @classmethod
     def __draw(self, context):
         prop = context.scene.confirm_wire_prop
-        obj = prop.cw_target
-        bm = bmesh_copy_from_object(obj, True, False, prop.cw_is_modifier)
-
-        # 頂点数が多すぎると負荷が高いため処理を中止する
-        vertex_count = len(bm.verts)
-        if vertex_count > prop.cw_max_vertex:
-            bm.free()
-            self.force_disable()
-            show_message_error('canceled because there are too many vertices.')
+        WireHud.begin_frame()
+        frame_start = perf_counter()
+
+        entries = []
+        for obj, color in self.get_targets(context):
+            # 抽出が完了するまでは描画しない
+            entry = WireCache.get_entry(obj, prop)
+            if entry is None:
+                continue
+
+            # 頂点数が多すぎると負荷が高いため処理を中止する（LODが有効な場合も頂点はすべて転送するため）
+            vertex_count = len(entry.coords)
+            if vertex_count > prop.cw_max_vertex:
+                self.force_disable()
+                show_message_error('canceled because there are too many vertices.')
+                return
+
+            WireHud.record_entry(obj.name, vertex_count, len(entry.edges))
+            entries.append((obj.name, entry, color))
+
+        if not entries:
             return
 
-        indices = []
-        indices_xray = []
-        for e in bm.edges:
-            v1 = e.verts[0]
-            v2 = e.verts[1]
-            normal = v1.normal + v2.normal
-
-            # 左右反転か
-            if prop.cw_is_flip_horizontal:
-                normal.x = normal.x * -1
-
-            # 3DVIEWから見て、法線の向きが内側であるか
-            if is_in_normal_from_view_3d(context, normal):
-                if prop.cw_is_xray:
-                    indices_xray.append((e.verts[0].index, e.verts[1].index))
-                continue
+        # シェーダーが作成できない環境ではCPUで判定する
+        shader, is_gpu_facing = WireRenderer.get_shader(prop.cw_facing_mode, prop.cw_line_width)
 
-            indices.append((e.verts[0].index, e.verts[1].index))
+        # シェーダーと視点は全対象で共有する
+        WireRenderer.begin(shader, prop.cw_line_width)
+        view_axis = get_view_axis_3d()
 
-        coords = []
-        for v in bm.verts:
-            co = v.co.copy()
-            coords.append(co)
+        for name, entry, color in entries:
+            # 左右反転は転送済みの座標をそのまま使い、モデル行列で反転する
+            matrix = get_model_matrix(entry.matrix, prop.cw_is_flip_horizontal)
 
-        if prop.cw_is_flip_horizontal:
-            coords = [(v[0]*-1, v[1], v[2]) for v in coords]
+            gpu.matrix.push()
+            gpu.matrix.multiply_matrix(matrix)
 
-        bgl.glEnable(bgl.GL_BLEND)
-        bgl.glLineWidth(prop.cw_line_width)
+            if is_gpu_facing:
+                self.__draw_gpu_facing(name, entry, prop, shader, view_axis, color)
+            else:
+                self.__draw_cpu_facing(name, entry, prop, shader, view_axis, matrix, color)
+
+            gpu.matrix.pop()
+
+        WireRenderer.end()
+        WireHud.add_time("total", frame_start)
 
-        shader = gpu.shader.from_builtin('3D_UNIFORM_COLOR')
-        shader.bind()
-        rgb = prop.cw_line_color
-        shader.uniform_float("color", (rgb[0], rgb[1], rgb[2], prop.cw_line_alpha))
-        batch = batch_for_shader(shader, 'LINES', {"pos": coords}, indices = indices)
-        batch.draw(shader)
+        # 間引いた辺を上限まで描画するまで再描画を続ける（視点の移動中は止まるのを待つ）
+        if any(WireCache.is_lod_refining(entry) for _, entry, _ in entries):
+            area_3d_view_tag_redraw_later()
+
+    @classmethod
+    def __draw_hud(self, context):
+        if not context.scene.confirm_wire_prop.cw_is_hud:
+            return
+        WireHud.draw([obj.name for obj, _ in self.get_targets(context)])
+
+    @classmethod
+    def __draw_cpu_facing(self, name, entry, prop, shader, view_axis, matrix, color):
+        # 視点・変形が変わったときのみ前後判定をやり直してバッチを作成する
+        batch_key = (get_view_rotation_key(), tuple(tuple(row) for row in matrix), prop.cw_is_xray)
+
+        # カリングする場合は視点の位置・ズームが変わったときも作り直す
+        if prop.cw_is_culling:
+            clip_matrix = get_perspective_matrix_3d() @ matrix
+            batch_key = batch_key + (tuple(tuple(row) for row in clip_matrix), )
+
+        reason = None
+        is_moving = self.__is_view_moving(entry, batch_key)
+        # LODで辺を増やすのは視点が止まってからにし、移動中は間引いた数のまま作り直す
+        is_rebuild = entry.batch_key != batch_key or (WireCache.is_lod_refining(entry) and not is_moving)
+        if entry.batch_key != batch_key and self.__is_rebuild_throttled(entry, prop, is_moving):
+            is_rebuild = False
+            reason = "throttled"
+        # 格子・LODの描画順はワーカースレッドで計算し、揃うまでは前回のバッチを描画する
+        elif is_rebuild and not WireCache.is_derived_ready(name, entry, prop.cw_is_culling, prop.cw_is_lod):
+            is_rebuild = False
+            reason = "waiting"
+
+        if is_rebuild:
+            start = perf_counter()
+            rebuild_start = start
+            # 視点が変わった場合、LODは間引いた状態からやり直す
+            if entry.batch_key != batch_key:
+                reason = "view" if entry.batch_key is not None else "geometry"
+                entry.lod_count = 0
+            else:
+                reason = "lod"
+
+            # 視錐台の中にある辺のみ判定・描画する
+            visible = None
+            if prop.cw_is_culling:
+                visible = get_visible_edges_from_grid(entry.edge_grid, clip_matrix)
+
+            edges = entry.edges
+            edge_normals = entry.edge_normals
+            edge_index = WireCache.next_edge_index(entry, prop, visible)
+            if edge_index is not None:
+                edges = edges[edge_index]
+                edge_normals = edge_normals[edge_index]
+
+            # 3DVIEWから見て、法線の向きが内側であるか（視点の取得は描画ごとに1回のみ）
+            front, back = classify_normals_from_view_3d(edge_normals, view_axis, entry.matrix, prop.cw_is_flip_horizontal)
+            indices = edges[front]
+            indices_xray = edges[back]
+            entry.drawn_count = len(indices) + (len(indices_xray) if prop.cw_is_xray else 0)
+            start = WireHud.add_time("classify", start)
+
+            # 頂点バッファは形状が変わるまで使いまわし、前後の辺はインデックスのみ作り直す
+            vbo, _ = WireRenderer.get_vert_buf(entry)
+            entry.batch = WireRenderer.create_batch(vbo, WireRenderer.create_index_buf(indices))
+            entry.batch_xray = None
+            if prop.cw_is_xray:
+                entry.batch_xray = WireRenderer.create_batch(vbo, WireRenderer.create_index_buf(indices_xray))
+            entry.batch_key = batch_key
+            WireHud.add_time("batch", start)
+            entry.rebuild_time = perf_counter()
+            entry.rebuild_seconds = entry.rebuild_time - rebuild_start
+        WireHud.record_batch(name, reason, entry.drawn_count)
+
+        start = perf_counter()
+        shader.uniform_float("color", color)
+        if entry.batch is not None:
+            entry.batch.draw(shader)
 
         # 透過か
-        if prop.cw_is_xray:
-            batch_xray = batch_for_shader(shader, 'LINES', {"pos": coords}, indices = indices_xray)
-            shader.uniform_float("color", (rgb[0], rgb[1], rgb[2], prop.cw_line_alpha * 0.5))
-            batch_xray.draw(shader)
+        if entry.batch_xray is not None:
+            shader.uniform_float("color", (color[0], color[1], color[2], color[3] * 0.5))
+            entry.batch_xray.draw(shader)
+        WireHud.add_time("draw", start)
+
+    @classmethod
+    def __is_view_moving(self, entry, batch_key):
+        """視点・変形が最後に変わってから、止まったとみなす時間が経っていないか
+        """
+        now = perf_counter()
+        if entry.last_view_key != batch_key:
+            entry.last_view_key = batch_key
+            entry.last_view_time = now
+        return now - entry.last_view_time < CW_SETTLE_INTERVAL
+
+    @classmethod
+    def __is_rebuild_throttled(self, entry, prop, is_moving):
+        """視点の移動中に前後判定をやり直さず、前回のバッチを描画するか
+        """
+        now = perf_counter()
+
+        # 形状が変わった場合（バッチがない）、前回の判定が予算内だった場合は間引かない
+        if not prop.cw_is_adaptive or entry.batch_key is None:
+            return False
+        if entry.rebuild_seconds * 1000 <= prop.cw_frame_budget:
+            return False
+
+        # 視点が止まった場合、上限の頻度を超えない場合はやり直す
+        if not is_moving:
+            return False
+        if now - entry.rebuild_time >= 1.0 / prop.cw_rebuild_rate:
+            return False
+
+        # 止まった後に判定し直せるよう再描画を予約する（移動中の再描画ではまた予約し直す）
+        if not bpy.app.timers.is_registered(confirm_wire_settle_timer):
+            bpy.app.timers.register(confirm_wire_settle_timer, first_interval = CW_SETTLE_INTERVAL)
+        return True
+
+    @classmethod
+    def __draw_gpu_facing(self, name, entry, prop, shader, view_axis, color):
+        # 法線ごと一度だけ転送し、視点が変わっても作り直さない（LODで辺を増やす場合を除く）
+        reason = None
+        start = perf_counter()
+        vbo, is_new_vbo = WireRenderer.get_vert_buf(entry, True)
+        is_rebuild = entry.batch_facing is None or WireCache.is_lod_refining(entry)
+        if is_rebuild and not WireCache.is_derived_ready(name, entry, False, prop.cw_is_lod):
+            reason = "waiting"
+        elif is_rebuild:
+            reason = "lod" if entry.batch_facing is not None else "geometry"
+            edge_index = WireCache.next_edge_index(entry, prop)
+            indices = get_edge_vertex_indices(len(entry.edges), edge_index)
+            entry.ibo_facing = WireRenderer.create_index_buf(indices)
+            entry.batch_facing = WireRenderer.create_batch(vbo, entry.ibo_facing)
+            entry.drawn_count = len(indices)
+            WireHud.add_time("batch", start)
+        elif is_new_vbo:
+            # 頂点のみ移動した場合は、インデックスのバッファを使いまわす
+            reason = "vertex"
+            entry.batch_facing = WireRenderer.create_batch(vbo, entry.ibo_facing)
+            WireHud.add_time("batch", start)
+        WireHud.record_batch(name, reason, entry.drawn_count)
+
+        if entry.batch_facing is None:
+            return
 
-        bgl.glDisable(bgl.GL_BLEND)
+        start = perf_counter()
 
-        # 対象が編集時以外はbmeshを解放する
-        if is_mesh_edit(obj) == False:
-            bm.free()
+        shader.uniform_float("u_ModelViewProjectionMatrix", gpu.matrix.get_projection_matrix() @ gpu.matrix.get_model_view_matrix())
+        shader.uniform_float("u_ViewAxis", get_normal_axis_from_view_3d(view_axis, entry.matrix, prop.cw_is_flip_horizontal))
+        shader.uniform_float("u_Color", color)
+        # 透過でない場合、内側を向いた線はシェーダーで破棄する
+        shader.uniform_float("u_BackAlpha", 0.5 if prop.cw_is_xray else 0.0)
+        entry.batch_facing.draw(shader)
+        WireHud.add_time("draw", start)
 
     def invoke(self, context, event):
         if context.area.type == 'VIEW_3D':
@@ -198,6 +420,33 @@ class ConfirmWireOperator(Operator):
         else:
             return {'CANCELLED'}
 
+class ConfirmWireTargetAddOperator(Operator) :
+    """対象を追加する
+    """
+    bl_idname = "confirm_wire_target_add.operator"
+    bl_label = ""
+    bl_description = ""
+
+    def execute(self, context) :
+        new_item = context.scene.confirm_wire_target_collection.add()
+        new_item.line_color = (random.random(), random.random(), random.random())
+        context.scene.confirm_wire_target_active_index = len(context.scene.confirm_wire_target_collection) - 1
+        return {'FINISHED'}
+
+class ConfirmWireTargetRemoveOperator(Operator) :
+    """対象を削除する
+    """
+    index: bpy.props.IntProperty(default = -1)
+
+    bl_idname = "confirm_wire_target_remove.operator"
+    bl_label = ""
+    bl_description = ""
+
+    def execute(self, context) :
+        context.scene.confirm_wire_target_collection.remove(self.index)
+        update_cw_target(self, context)
+        return {'FINISHED'}
+
 class ConfirmWireAnnotateOperator(Operator):
     bl_idname = "confirm_wire_annotate.operator"
     bl_label = "Annotate"
@@ -207,8 +456,7 @@ class ConfirmWireAnnotateOperator(Operator):
     def invoke(self, context, event):
         if context.area.type == 'VIEW_3D':
             obj = context.active_object
-            bm = bmesh_from_object(obj)
-            selected_edge_coords = Annotate.get_selected_edge_coords(bm, obj)
+            selected_edge_coords = Annotate.get_selected_edge_coords(obj)
             color = context.scene.confirm_wire_annotate_collection[self.index].color
             hide = context.scene.confirm_wire_annotate_collection[self.index].hide
             opacity = get_opacity_value(context.scene.confirm_wire_annotate_collection[self.index].opacity)
@@ -279,7 +527,7 @@ class ConfirmWireAnnotateToSelectOperator(Operator) :
     bl_description = ""
 
     def execute(self, context) :
-        Annotate.annotate_to_select(context, self.index)
+        Annotate.annotate_to_select(context, self.index, context.scene.confirm_wire_prop.cw_select_tolerance)
         return {'FINISHED'}
 
 class ConfirmWireShowEdgeSeamsOperator(Operator) :
@@ -367,9 +615,22 @@ class VIEW3D_PT_ConfirmWirePanel(Panel):
         row = layout.row()
         row.scale_y = 1.5
         row.prop(prop, "cw_target")
+
+        # 追加の対象一覧
+        row = layout.row()
+        row.template_list(
+            "VIEW3D_UL_ConfirmWireTargetListLayout",
+            "",
+            context.scene,
+            "confirm_wire_target_collection",
+            context.scene,
+            "confirm_wire_target_active_index",
+            rows = 2)
+        row = layout.row()
+        row.operator(ConfirmWireTargetAddOperator.bl_idname, text = "Add Target", icon = "ADD")
         layout.separator()
 
-        if prop.cw_target is None:
+        if prop.cw_target is None and len(context.scene.confirm_wire_target_collection) == 0:
             return
 
         # -------------------------------------------------
@@ -401,6 +662,8 @@ class VIEW3D_PT_ConfirmWirePanel(Panel):
         row = layout.row()
         row.scale_y = 1.5
         row.prop(prop, "cw_is_xray", icon = "XRAY")
+        row = layout.row()
+        row.prop(prop, "cw_facing_mode", expand = True)
 
         # -------------------------------------------------
         layout.separator()
@@ -415,6 +678,52 @@ class VIEW3D_PT_ConfirmWirePanel(Panel):
         layout.separator()
         row = layout.row()
         row.prop(prop, "cw_max_vertex", icon = "OUTLINER_DATA_MESH")
+        row = layout.row()
+        row.prop(prop, "cw_is_lod")
+        row = layout.row()
+        row.enabled = prop.cw_is_lod
+        row.prop(prop, "cw_lod_budget")
+        row = layout.row()
+        row.enabled = prop.cw_is_lod
+        row.prop(prop, "cw_lod_step")
+        row = layout.row()
+        row.enabled = prop.cw_is_lod
+        row.prop(prop, "cw_lod_limit")
+        row = layout.row()
+        row.enabled = prop.cw_facing_mode == 'CPU'
+        row.prop(prop, "cw_is_culling")
+        row = layout.row()
+        row.enabled = prop.cw_facing_mode == 'CPU'
+        row.prop(prop, "cw_is_adaptive")
+        row = layout.row()
+        row.enabled = prop.cw_facing_mode == 'CPU' and prop.cw_is_adaptive
+        row.prop(prop, "cw_frame_budget")
+        row.prop(prop, "cw_rebuild_rate")
+        row = layout.row()
+        row.prop(prop, "cw_is_hud")
+
+class VIEW3D_UL_ConfirmWireTargetListLayout(UIList) :
+    """追加の対象一覧
+    """
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index) :
+        sp = layout.split(align=True, factor=0.5)
+
+        # オブジェクト
+        sp.prop(item, "target", text = "")
+
+        # カラー
+        sp.prop(item, "line_color", text = "")
+        sp.prop(item, "line_alpha", text = "")
+
+        # 表示 / 非表示
+        if item.hide:
+            sp.prop(item, "hide", text = "", icon = "HIDE_ON")
+        else:
+            sp.prop(item, "hide", text = "", icon = "HIDE_OFF")
+
+        # 削除
+        op = sp.operator(ConfirmWireTargetRemoveOperator.bl_idname, text = "", icon = "REMOVE")
+        op.index = index
 
 class VIEW3D_UL_ConfirmWireAnnotateListLayout(UIList) :
     """アノテート一覧
@@ -496,6 +805,8 @@ class VIEW3D_PT_ConfirmWireAnnotatePanel(Panel):
         row.scale_y = 1.5
         row.prop(prop, "cw_max_annotate", text="Max Annotate")
         row = layout.row()
+        row.prop(prop, "cw_select_tolerance", text="Select Tolerance")
+        row = layout.row()
         row.scale_y = 1.5
         row.operator(ConfirmWireAnnotateInitOperator.bl_idname, text = "Reload")
 
@@ -591,7 +902,10 @@ class ConfirmWirePreferences(bpy.types.AddonPreferences):
 classes = (
     ConfirmWirePropertyGroup,
     ConfirmWireAnnotateListPropertyGroup,
+    ConfirmWireTargetListPropertyGroup,
     ConfirmWireOperator,
+    ConfirmWireTargetAddOperator,
+    ConfirmWireTargetRemoveOperator,
     ConfirmWireAnnotateOperator,
     # ConfirmWireAnnotateViewOperator,
     ConfirmWireAnnotateRemoveOperator,
@@ -607,6 +921,7 @@ classes = (
     VIEW3D_PT_ConfirmWireHelperPanel,
     ConfirmWirePreferences,
     VIEW3D_UL_ConfirmWireAnnotateListLayout,
+    VIEW3D_UL_ConfirmWireTargetListLayout,
     )
 
 def register():
@@ -617,13 +932,22 @@ def register():
     bpy.types.Scene.confirm_wire_prop = PointerProperty(type = ConfirmWirePropertyGroup)
     bpy.types.Scene.confirm_wire_annotate_collection = CollectionProperty(type = ConfirmWireAnnotateListPropertyGroup)
     bpy.types.Scene.confirm_wire_annotate_active_index = IntProperty(name = "confirm_wire_annotate_active_index", default = -1)
+    bpy.types.Scene.confirm_wire_target_collection = CollectionProperty(type = ConfirmWireTargetListPropertyGroup)
+    bpy.types.Scene.confirm_wire_target_active_index = IntProperty(name = "confirm_wire_target_active_index", default = -1)
+    WireCache.register()
+    WireRenderer.register()
 
 def unregister():
+    WireCache.unregister()
+    AnnotateSelectCache.unregister()
+    WireRenderer.unregister()
     for cls in classes:
         bpy.utils.unregister_class(cls)
     del bpy.types.Scene.confirm_wire_prop
-    del bpy.types.Scene.dynamic_solidify_collection 
-    del bpy.types.Scene.dynamic_solidify_collection_active_index
+    del bpy.types.Scene.confirm_wire_annotate_collection
+    del bpy.types.Scene.confirm_wire_annotate_active_index
+    del bpy.types.Scene.confirm_wire_target_collection
+    del bpy.types.Scene.confirm_wire_target_active_index
 
     addon_updater_ops.unregister()
 
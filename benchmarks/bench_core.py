@@ -0,0 +1,159 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# wire_core の計算のみを計測する（Blenderを使わず、numpyのみで実行できる）
+#
+#   python benchmarks/bench_core.py --sizes 10000 1000000 --output result.json
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import sys
+
+from time import perf_counter
+
+import numpy as np
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [10000, 100000, 500000, 2000000]
+
+def load_core():
+    """アドオンの __init__ はbpyを読み込むため、wire_core のみを直接読み込む
+    """
+    spec = importlib.util.spec_from_file_location("confirm_wire_core", os.path.join(ADDON_DIR, "wire_core.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def parse_args():
+    parser = argparse.ArgumentParser(description = "ConfirmWire core benchmark")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = DEFAULT_SIZES, help = "target vertex counts")
+    parser.add_argument("--repeat", type = int, default = 5, help = "runs per stage, the median is reported")
+    parser.add_argument("--views", type = int, default = 8, help = "view directions per classification run")
+    parser.add_argument("--lod-budget", type = int, default = 100000)
+    parser.add_argument("--output", default = None, help = "write JSON here instead of stdout")
+    return parser.parse_args()
+
+def measure(func, repeat):
+    """中央値の時間（秒）と最後の戻り値を返す
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = perf_counter()
+        result = func()
+        times.append(perf_counter() - start)
+    return float(np.median(times)), result
+
+def create_sphere_arrays(vertex_count):
+    """UV球の頂点・辺・法線（Blenderから抽出した場合と同じ型）
+    """
+    rings = max(3, int(math.sqrt(vertex_count / 2)))
+    segments = max(3, vertex_count // rings)
+    theta = np.linspace(0.0, np.pi, rings + 2, dtype = np.float32)[1:-1]
+    phi = np.linspace(0.0, 2.0 * np.pi, segments, endpoint = False, dtype = np.float32)
+    t, p = np.meshgrid(theta, phi, indexing = 'ij')
+    normals = np.stack([np.sin(t) * np.cos(p), np.sin(t) * np.sin(p), np.cos(t)], axis = -1).reshape(-1, 3).astype(np.float32)
+    coords = normals.copy()
+
+    index = np.arange(rings * segments, dtype = np.int32).reshape(rings, segments)
+    around = np.stack([index, np.roll(index, -1, axis = 1)], axis = -1).reshape(-1, 2)
+    down = np.stack([index[:-1], index[1:]], axis = -1).reshape(-1, 2)
+    edges = np.ascontiguousarray(np.concatenate([around, down]), dtype = np.int32)
+    return coords, edges, normals
+
+def get_view_axes(count):
+    # 球面上にほぼ均等に並べた視点の向き
+    i = np.arange(count) + 0.5
+    z = 1.0 - 2.0 * i / count
+    r = np.sqrt(1.0 - z * z)
+    phi = i * np.pi * (3.0 - np.sqrt(5.0))
+    return np.stack([r * np.cos(phi), r * np.sin(phi), z], axis = -1).astype(np.float32)
+
+def get_clip_matrix(view_axis, distance = 1.5, fov = math.radians(50.0)):
+    # 原点を見る透視投影行列（ローカル座標からクリップ座標）
+    forward = -view_axis / np.linalg.norm(view_axis)
+    up = np.array([0.0, 0.0, 1.0]) if abs(forward[2]) < 0.99 else np.array([0.0, 1.0, 0.0])
+    right = np.cross(forward, up)
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    eye = view_axis * distance
+    view = np.identity(4)
+    view[0, :3], view[1, :3], view[2, :3] = right, up, -forward
+    view[:3, 3] = -view[:3, :3] @ eye
+
+    near, far = 0.01, 100.0
+    f = 1.0 / math.tan(fov / 2.0)
+    projection = np.array([
+        [f, 0.0, 0.0, 0.0],
+        [0.0, f, 0.0, 0.0],
+        [0.0, 0.0, (far + near) / (near - far), 2.0 * far * near / (near - far)],
+        [0.0, 0.0, -1.0, 0.0]])
+    return projection @ view
+
+def bench_size(core, vertex_count, args):
+    repeat = args.repeat
+    coords, edges, normals = create_sphere_arrays(vertex_count)
+    result = {"vertex_count": len(coords), "edge_count": len(edges)}
+
+    result["edge_normals"], edge_normals = measure(lambda: core.get_edge_normals(normals, edges), repeat)
+    result["edge_grid"], edge_grid = measure(lambda: core.build_edge_grid(coords, edges), repeat)
+    result["lod_order"], lod_order = measure(lambda: core.get_lod_order(len(edges)), repeat)
+
+    # 視点が変わるたびに行うもの（1視点あたり）
+    axes = get_view_axes(args.views)
+    seconds, _ = measure(lambda: [core.classify_edge_normals(edge_normals, axis) for axis in axes], repeat)
+    result["classify"] = seconds / len(axes)
+
+    clip_matrices = [get_clip_matrix(axis) for axis in axes]
+    seconds, visibles = measure(lambda: [core.get_visible_edges_from_grid(edge_grid, m) for m in clip_matrices], repeat)
+    result["cull"] = seconds / len(axes)
+    result["visible_ratio"] = float(np.mean([visible.mean() for visible in visibles]))
+
+    visible = visibles[0]
+    result["next_edge_index"], _ = measure(
+        lambda: core.get_next_edge_index(len(edges), lod_order, 0, args.lod_budget, visible), repeat)
+
+    matrix = np.identity(4, dtype = np.float32)
+    matrix[:3, 3] = (1.0, 2.0, 3.0)
+    result["edge_coords"], _ = measure(lambda: core.get_edge_coords(coords, edges, matrix), repeat)
+    return result
+
+def main():
+    args = parse_args()
+    core = load_core()
+
+    results = []
+    for size in args.sizes:
+        results.append(bench_size(core, size, args))
+        print("ConfirmWire core bench: %d done" % size, file = sys.stderr)
+
+    report = {
+        "numpy": np.__version__,
+        "repeat": args.repeat,
+        "views": args.views,
+        "unit": "seconds",
+        "results": results,
+    }
+    text = json.dumps(report, indent = 2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
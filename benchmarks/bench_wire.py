@@ -0,0 +1,243 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# ConfirmWireの抽出・前後判定・バッチ作成の処理時間を計測する
+#
+#   blender --background --factory-startup --python benchmarks/bench_wire.py -- --output result.json
+#
+# バックグラウンド起動ではGPUが使えないため、バッチ作成は計測せずに skipped を出力する
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import sys
+
+from time import perf_counter
+
+import bmesh
+import bpy
+import numpy as np
+
+from mathutils import Matrix, Vector
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [10000, 100000, 500000, 2000000]
+SHAPES = ["grid", "suzanne", "noise"]
+
+def load_addon():
+    """アドオンを登録せずに読み込む（フォルダ名によらず相対importが使えるようにする）
+    """
+    spec = importlib.util.spec_from_file_location(
+        "confirm_wire_bench",
+        os.path.join(ADDON_DIR, "__init__.py"),
+        submodule_search_locations = [ADDON_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description = "ConfirmWire benchmark")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = DEFAULT_SIZES, help = "target vertex counts")
+    parser.add_argument("--shapes", nargs = "+", default = SHAPES, choices = SHAPES)
+    parser.add_argument("--repeat", type = int, default = 5, help = "runs per stage, the median is reported")
+    parser.add_argument("--views", type = int, default = 8, help = "view directions per classification run")
+    parser.add_argument("--no-modifier", action = "store_true", help = "skip the subdivision modifier cases")
+    parser.add_argument("--output", default = None, help = "write JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+def measure(func, repeat):
+    """中央値の時間（秒）と最後の戻り値を返す
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = perf_counter()
+        result = func()
+        times.append(perf_counter() - start)
+    return float(np.median(times)), result
+
+# -------------------------------------------------
+# メッシュの作成
+
+def create_grid(bm, vertex_count):
+    segments = max(1, int(math.sqrt(vertex_count)) - 1)
+    bmesh.ops.create_grid(bm, x_segments = segments, y_segments = segments, size = 1.0)
+
+def create_suzanne(bm, vertex_count):
+    bmesh.ops.create_monkey(bm)
+    # 1回で約4倍になるため、目標を超えない範囲で細分化する
+    while len(bm.verts) * 4 <= vertex_count:
+        bmesh.ops.subdivide_edges(bm, edges = bm.edges[:], cuts = 1, use_grid_fill = True)
+
+def create_noise(bm, vertex_count):
+    create_grid(bm, vertex_count)
+
+def add_noise(me):
+    # スキャンデータのように凹凸と乱れのある面にする
+    coords = np.empty(len(me.vertices) * 3, dtype = np.float32)
+    me.vertices.foreach_get("co", coords)
+    coords = coords.reshape(-1, 3)
+    coords[:, 2] = 0.05 * np.sin(coords[:, 0] * 40.0) * np.cos(coords[:, 1] * 40.0)
+    coords += np.random.RandomState(0).normal(scale = 0.002, size = coords.shape).astype(np.float32)
+    me.vertices.foreach_set("co", coords.ravel())
+    me.update()
+
+def create_object(shape, vertex_count, is_modifier):
+    # モディファイアありの場合は細分化後に目標の頂点数になるようにする
+    base_count = max(100, vertex_count // 4) if is_modifier else vertex_count
+
+    bm = bmesh.new()
+    {"grid": create_grid, "suzanne": create_suzanne, "noise": create_noise}[shape](bm, base_count)
+    me = bpy.data.meshes.new("bench_%s_%d" % (shape, vertex_count))
+    bm.to_mesh(me)
+    bm.free()
+    if shape == "noise":
+        add_noise(me)
+
+    obj = bpy.data.objects.new(me.name, me)
+    bpy.context.scene.collection.objects.link(obj)
+    if is_modifier:
+        modifier = obj.modifiers.new("subdivision", 'SUBSURF')
+        modifier.levels = 1
+    bpy.context.view_layer.update()
+    return obj
+
+def remove_object(obj):
+    me = obj.data
+    bpy.data.objects.remove(obj)
+    bpy.data.meshes.remove(me)
+
+# -------------------------------------------------
+# 視点
+
+def get_view_axes(count):
+    # 球面上にほぼ均等に並べた視点の向き
+    axes = []
+    for i in range(count):
+        z = 1.0 - 2.0 * (i + 0.5) / count
+        r = math.sqrt(1.0 - z * z)
+        phi = i * math.pi * (3.0 - math.sqrt(5.0))
+        axes.append(Vector((r * math.cos(phi), r * math.sin(phi), z)))
+    return axes
+
+def get_perspective_matrix(view_axis, distance = 1.5, fov = math.radians(50.0)):
+    # 原点を見る透視投影行列（ワールド座標からクリップ座標）
+    view = view_axis.to_track_quat('Z', 'Y').to_matrix().to_4x4()
+    view.translation = view_axis * distance
+    view = view.inverted()
+
+    near, far = 0.01, 100.0
+    f = 1.0 / math.tan(fov / 2.0)
+    projection = Matrix((
+        (f, 0.0, 0.0, 0.0),
+        (0.0, f, 0.0, 0.0),
+        (0.0, 0.0, (far + near) / (near - far), 2.0 * far * near / (near - far)),
+        (0.0, 0.0, -1.0, 0.0)))
+    return projection @ view
+
+# -------------------------------------------------
+# 計測
+
+def bench_case(addon, obj, is_modifier, args):
+    WireCache = addon.WireCache
+    repeat = args.repeat
+    result = {"object": obj.name, "modifier": is_modifier}
+
+    # 抽出（bpyからnumpyへのコピー）
+    seconds, arrays = measure(lambda: addon.mesh_arrays_from_object(obj, is_modifier), repeat)
+    coords, edges, normals = arrays
+    result["vertex_count"] = len(coords)
+    result["edge_count"] = len(edges)
+    result["extract"] = seconds
+
+    # 抽出後の計算（ワーカースレッドで行うもの）
+    entry = addon.WireCacheEntry(None)
+    result["edge_normals"], _ = measure(lambda: WireCache.set_entry_arrays(entry, coords, edges, normals), repeat)
+    result["edge_grid"], _ = measure(lambda: addon.build_edge_grid(coords, edges), repeat)
+    entry.edge_grid = addon.build_edge_grid(coords, edges)
+    result["lod_order"], entry.lod_order = measure(lambda: addon.get_lod_order(len(edges)), repeat)
+
+    # 前後判定・カリング（視点が変わるたびに行うもの、1視点あたり）
+    views = get_view_axes(args.views)
+    matrix = obj.matrix_world
+    def classify():
+        return [addon.classify_normals_from_view_3d(entry.edge_normals, axis, matrix) for axis in views]
+    seconds, masks = measure(classify, repeat)
+    result["classify"] = seconds / len(views)
+
+    clip_matrices = [get_perspective_matrix(axis) @ matrix for axis in views]
+    def cull():
+        return [addon.get_visible_edges_from_grid(entry.edge_grid, clip) for clip in clip_matrices]
+    seconds, _ = measure(cull, repeat)
+    result["cull"] = seconds / len(views)
+
+    # バッチ作成（GPUが使えない場合は計測しない）
+    front, back = masks[0]
+    try:
+        seconds, vbo = measure(lambda: addon.WireRenderer.create_vert_buf(coords), repeat)
+        result["vertex_buffer"] = seconds
+        def index_batches():
+            renderer = addon.WireRenderer
+            return (
+                renderer.create_batch(vbo, renderer.create_index_buf(edges[front])),
+                renderer.create_batch(vbo, renderer.create_index_buf(edges[back])))
+        result["index_batches"], _ = measure(index_batches, repeat)
+    except Exception as e:
+        result["vertex_buffer"] = None
+        result["index_batches"] = None
+        result["gpu_skipped"] = str(e)
+
+    return result
+
+def main():
+    args = parse_args()
+    addon = load_addon()
+
+    results = []
+    modifier_cases = [False] if args.no_modifier else [False, True]
+    for shape in args.shapes:
+        for size in args.sizes:
+            for is_modifier in modifier_cases:
+                obj = create_object(shape, size, is_modifier)
+                try:
+                    case = bench_case(addon, obj, is_modifier, args)
+                finally:
+                    remove_object(obj)
+                case["shape"] = shape
+                case["target_vertex_count"] = size
+                results.append(case)
+                print("ConfirmWire bench: %s %d modifier=%s done" % (shape, size, is_modifier), file = sys.stderr)
+
+    report = {
+        "blender": bpy.app.version_string,
+        "background": bpy.app.background,
+        "numpy": np.__version__,
+        "repeat": args.repeat,
+        "views": args.views,
+        "unit": "seconds",
+        "results": results,
+    }
+    text = json.dumps(report, indent = 2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
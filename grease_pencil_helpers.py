@@ -28,18 +28,42 @@ def get_gp_layer(context, layer_name, new_layer = True) :
                 layer = gp.layers[0]
                 gp.layers.active = layer
         else :
-            if any( layer_name in l.info for l in  gp.layers ) :
-                for l in gp.layers :
-                    if layer_name in l.info : 
-                        layer = l
-                        break
-            else :
-                if new_layer:
-                    layer = gp.layers.new(layer_name , set_active = gp.layers.active == None )
-                    gp.layers.active = layer
+            # 名前の一部ではなく完全一致で探す（__Annotate__1 が __Annotate__10 に一致しないように）
+            layer = find_gp_layer(gp, layer_name)
+            if layer is None and new_layer:
+                layer = gp.layers.new(layer_name , set_active = gp.layers.active == None )
+                gp.layers.active = layer
+                index = gp_layer_index.get(gp.as_pointer())
+                if index is not None:
+                    index[layer.info] = len(gp.layers) - 1
 
         return layer
 
+# グリースペンシルごとの、レイヤー名からレイヤーの位置への索引
+gp_layer_index = {}
+
+# レイヤー名と完全一致するレイヤーを索引から探す
+def find_gp_layer(gp, layer_name) :
+    layers = gp.layers
+    index = gp_layer_index.get(gp.as_pointer())
+    position = None if index is None else index.get(layer_name)
+    # レイヤーの位置と名前が変わっていないか確認する
+    if position is not None and position < len(layers) and layers[position].info == layer_name :
+        return layers[position]
+
+    # 見つからない場合は索引が古い可能性がある（レイヤーの追加・削除・名前の変更・元に戻す）ため作り直す
+    # レイヤーの数が同じでも名前が入れ替わっている場合があるため、数では判断しない
+    # （見つからないのはまだ作成していないスロットのみのため、作り直しは作成時の一度で済む）
+    index = { l.info : i for i, l in enumerate(layers) }
+    gp_layer_index[gp.as_pointer()] = index
+    position = index.get(layer_name)
+    return None if position is None else layers[position]
+
+# レイヤーを削除する（位置がずれるため索引は作り直す）
+def remove_gp_layer(gp, layer) :
+    gp.layers.remove(layer)
+    gp_layer_index.pop(gp.as_pointer(), None)
+
 # from https://github.com/sakana3/PolyQuilt/tree/master/Addons/PolyQuilt / LICENSE GNU
 def get_gp_frame(layer) :
     if len(layer.frames) == 0 :
@@ -13,6 +13,13 @@
 
 import bpy
 import math
+import numpy as np
+
+from mathutils import Matrix
+from .wire_core import *
+
+# 左右反転（ワールド座標のX軸で反転する）
+FLIP_HORIZONTAL_MATRIX = Matrix.Scale(-1, 4, (1, 0, 0))
 
 # def get_region_view_3d(context):
 #     area = get_area_view_3d(context)
@@ -55,11 +62,46 @@ def get_space_view_3d():
 #     euler = vector.to_track_quat('Z', 'Y').to_euler()
 #     return math.degrees(euler.z)
 
-# VIEW3Dの視点から、法線が内側であるか
-def is_in_normal_from_view_3d(context, normal):
+# VIEW3Dの視点の向きをワールド座標で取得する
+def get_view_axis_3d():
     space_view_3d = get_space_view_3d()
-    matrix_z = space_view_3d.region_3d.view_rotation.to_matrix().col[2]
-    return normal.dot(matrix_z) < 0
+    return space_view_3d.region_3d.view_rotation.to_matrix().col[2]
+
+# 法線と比較するための視点の向きを取得する（GPUで判定する場合はこのままシェーダーに渡す）
+# matrix は法線のローカル座標からワールド座標への行列
+def get_normal_axis_from_view_3d(view_axis, matrix = None, is_flip_horizontal = False):
+    axis = view_axis.copy()
+
+    # 左右反転した法線との内積は、視点を反転した内積と等しい
+    if is_flip_horizontal:
+        axis.x = axis.x * -1
+
+    # 法線は逆転置行列で変換されるため、視点側を逆行列で変換すればローカル座標のまま比較できる
+    if matrix is not None:
+        axis = matrix.to_3x3().inverted_safe() @ axis
+
+    return axis
+
+# VIEW3Dの視点から、法線が外側である辺(front)と内側である辺(back)をまとめて判定する
+# normals は (E, 3) の辺の法線
+def classify_normals_from_view_3d(normals, view_axis, matrix = None, is_flip_horizontal = False):
+    return classify_edge_normals(normals, get_normal_axis_from_view_3d(view_axis, matrix, is_flip_horizontal))
+
+# VIEW3Dの透視投影行列（ワールド座標からクリップ座標）を取得する
+def get_perspective_matrix_3d():
+    space_view_3d = get_space_view_3d()
+    return space_view_3d.region_3d.perspective_matrix
+
+# 描画時のモデル行列を取得する（左右反転もここで行い、座標は反転しない）
+def get_model_matrix(matrix_world, is_flip_horizontal = False):
+    if is_flip_horizontal:
+        return FLIP_HORIZONTAL_MATRIX @ matrix_world
+    return matrix_world
+
+# VIEW3Dの視点の回転をキャッシュのキーとして取得する
+def get_view_rotation_key():
+    space_view_3d = get_space_view_3d()
+    return tuple(space_view_3d.region_3d.view_rotation)
 
 # カラーコードから10進数に変換
 # def hex_code_to_rgb_int_0_255(hex_code):
@@ -81,6 +123,20 @@ def area_3d_view_tag_redraw_all():
         if area.type == 'VIEW_3D':
             area.tag_redraw()
 
+# 全ウィンドウの3DVIEWを再描画する（タイマーなどscreenが取得できない場合用）
+def area_3d_view_tag_redraw_windows():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+# 描画中は再描画を要求できないため、タイマーで次の再描画を要求する
+def area_3d_view_tag_redraw_later(interval = 0.0):
+    def redraw():
+        area_3d_view_tag_redraw_windows()
+        return None
+    bpy.app.timers.register(redraw, first_interval = interval)
+
 def show_message_info(message):
     def draw(self, context):
         self.layout.label(text = message)
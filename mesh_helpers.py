@@ -20,11 +20,13 @@
 
 import bmesh
 import bpy
+import numpy as np
 # import bgl
 # import gpu
 # from gpu_extras.batch import batch_for_shader
 # from sys import exc_info
 from bmesh import from_edit_mesh
+from itertools import chain
 # from bpy_extras import view3d_utils, mesh_utils
 # from math import fabs, degrees, radians, sqrt, cos, sin, pi
 # from mathutils.geometry import tessellate_polygon as tessellate
@@ -234,6 +236,122 @@ def bmesh_copy_from_object(obj, transform=True, triangulate=True, apply_modifier
     return bm
 
 
+def mesh_arrays_from_mesh(me):
+    """
+    Returns vertex coordinates, edge vertex indices and vertex normals of the mesh as numpy arrays
+    """
+    vertex_count = len(me.vertices)
+    edge_count = len(me.edges)
+
+    coords = np.empty(vertex_count * 3, dtype=np.float32)
+    me.vertices.foreach_get("co", coords)
+
+    edges = np.empty(edge_count * 2, dtype=np.int32)
+    me.edges.foreach_get("vertices", edges)
+
+    normals = np.empty(vertex_count * 3, dtype=np.float32)
+    if hasattr(me, "vertex_normals"):
+        me.vertex_normals.foreach_get("vector", normals)
+    else:
+        me.vertices.foreach_get("normal", normals)
+
+    return coords.reshape(-1, 3), edges.reshape(-1, 2), normals.reshape(-1, 3)
+
+
+def bmesh_coord_array(bm):
+    """
+    Returns vertex coordinates of the bmesh as a numpy array
+    """
+    count = len(bm.verts) * 3
+    coords = np.fromiter(chain.from_iterable(v.co for v in bm.verts), dtype=np.float32, count=count)
+    return coords.reshape(-1, 3)
+
+
+def bmesh_vertex_arrays(bm):
+    """
+    Returns vertex coordinates and vertex normals of the bmesh as numpy arrays
+    """
+    # Coordinates and normals are read in a single pass over the vertices
+    count = len(bm.verts) * 6
+    arrays = np.fromiter(chain.from_iterable(chain(v.co, v.normal) for v in bm.verts), dtype=np.float32, count=count).reshape(-1, 6)
+    return np.ascontiguousarray(arrays[:, :3]), np.ascontiguousarray(arrays[:, 3:])
+
+
+def bmesh_edge_array(bm):
+    """
+    Returns edge vertex indices of the bmesh as a numpy array
+    """
+    bm.verts.index_update()
+    count = len(bm.edges) * 2
+    edges = np.fromiter(chain.from_iterable((e.verts[0].index, e.verts[1].index) for e in bm.edges), dtype=np.int32, count=count)
+    return edges.reshape(-1, 2)
+
+
+def mesh_arrays_from_bmesh(bm):
+    """
+    Same as mesh_arrays_from_mesh() for a bmesh (edit mode has no foreach_get)
+    """
+    coords, normals = bmesh_vertex_arrays(bm)
+    return coords, bmesh_edge_array(bm), normals
+
+
+def selected_edge_arrays(obj):
+    """
+    Returns untransformed vertex coordinates and the vertex indices of the selected edges as numpy arrays
+    """
+
+    assert obj.type == 'MESH'
+
+    # Edit mode has no foreach_get, only the selected edges' end points are read
+    if obj.mode == 'EDIT':
+        bm = from_edit_mesh(obj.data)
+        selected = [e for e in bm.edges if e.select]
+        coords = np.fromiter(chain.from_iterable(chain(e.verts[0].co, e.verts[1].co) for e in selected), dtype=np.float32, count=len(selected) * 6)
+        edges = np.arange(len(selected) * 2, dtype=np.int32)
+        return coords.reshape(-1, 3), edges.reshape(-1, 2)
+
+    me = obj.data
+    select = np.empty(len(me.edges), dtype=bool)
+    me.edges.foreach_get("select", select)
+
+    edges = np.empty(len(me.edges) * 2, dtype=np.int32)
+    me.edges.foreach_get("vertices", edges)
+
+    coords = np.empty(len(me.vertices) * 3, dtype=np.float32)
+    me.vertices.foreach_get("co", coords)
+
+    return coords.reshape(-1, 3), edges.reshape(-1, 2)[select]
+
+
+def mesh_arrays_from_object(obj, apply_modifiers=False):
+    """
+    Returns untransformed vertex coordinates, edge vertex indices and vertex normals as numpy arrays
+    """
+
+    assert obj.type == 'MESH'
+
+    if apply_modifiers and obj.modifiers:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        obj_eval = obj.evaluated_get(depsgraph)
+
+        # In object mode the evaluated object already owns the final mesh,
+        # read it directly instead of making a to_mesh() copy
+        if obj.mode == 'OBJECT' and bpy.app.version >= (3, 0, 0):
+            return mesh_arrays_from_mesh(obj_eval.data)
+
+        me = obj_eval.to_mesh()
+        arrays = mesh_arrays_from_mesh(me)
+        obj_eval.to_mesh_clear()
+        return arrays
+
+    # Object mode reads the mesh data as is, edit mode reads the live edit bmesh
+    # without copying it (update_from_editmode() would tag a depsgraph update)
+    if obj.mode == 'EDIT':
+        return mesh_arrays_from_bmesh(from_edit_mesh(obj.data))
+
+    return mesh_arrays_from_mesh(obj.data)
+
+
 def bmesh_from_object(obj):
     """
     Object/Edit Mode get mesh, use bmesh_to_object() to write back.
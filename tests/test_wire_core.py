@@ -0,0 +1,340 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# wire_core の計算のテスト（Blenderの外で python -m pytest で実行する）
+
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+# アドオンの __init__.py は bpy を読み込むため、wire_core.py のみを直接読み込む
+def load_wire_core():
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wire_core.py")
+    spec = importlib.util.spec_from_file_location("wire_core", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+core = load_wire_core()
+
+# 透視投影行列（カメラは原点から -Z を向く）
+def perspective_matrix(fov = 1.0, near = 0.1, far = 100.0):
+    f = 1.0 / np.tan(fov / 2)
+    return np.array([
+        [f, 0, 0, 0],
+        [0, f, 0, 0],
+        [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+        [0, 0, -1, 0],
+    ], dtype = np.float32)
+
+def look_at_matrix(eye, target):
+    eye = np.asarray(eye, dtype = np.float32)
+    forward = np.asarray(target, dtype = np.float32) - eye
+    forward /= np.linalg.norm(forward)
+    right = np.cross(forward, [0, 0, 1]) if abs(forward[2]) < 0.99 else np.cross(forward, [0, 1, 0])
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    m = np.eye(4, dtype = np.float32)
+    m[0, :3], m[1, :3], m[2, :3] = right, up, -forward
+    m[:3, 3] = -m[:3, :3] @ eye
+    return m
+
+def random_mesh(seed, vertex_count = 400, edge_count = 1200):
+    rng = np.random.RandomState(seed)
+    coords = (rng.rand(vertex_count, 3) * 20 - 10).astype(np.float32)
+    edges = rng.randint(0, vertex_count, size = (edge_count, 2)).astype(np.int32)
+    return coords, edges
+
+# --- get_edge_normals / classify_edge_normals ---
+
+def test_edge_normals_are_sum_of_vertex_normals():
+    normals = np.array([[0, 0, 1], [0, 1, 0], [1, 0, 0]], dtype = np.float32)
+    edges = np.array([[0, 1], [1, 2], [2, 0]], dtype = np.int32)
+    np.testing.assert_array_equal(core.get_edge_normals(normals, edges), [[0, 1, 1], [1, 1, 0], [1, 0, 1]])
+
+def test_classify_edge_normals():
+    edge_normals = np.array([[0, 0, 1], [0, 0, -1], [1, 0, 0], [0, 0, 0]], dtype = np.float32)
+    front, back = core.classify_edge_normals(edge_normals, (0, 0, 1))
+    np.testing.assert_array_equal(front, [True, False, True, True])
+    np.testing.assert_array_equal(back, ~front)
+
+def test_classify_edge_normals_reversed_axis_swaps_sides():
+    rng = np.random.RandomState(0)
+    edge_normals = (rng.rand(100, 3) * 2 - 1).astype(np.float32)
+    axis = np.array([0.3, -0.5, 0.8], dtype = np.float32)
+    front, back = core.classify_edge_normals(edge_normals, axis)
+    flip_front, flip_back = core.classify_edge_normals(edge_normals, -axis)
+    # 内積が0の辺はないため、視点を逆にすると前後が入れ替わる
+    np.testing.assert_array_equal(flip_front, back)
+    np.testing.assert_array_equal(flip_back, front)
+
+def test_classify_edge_normals_flip_horizontal_axis():
+    # 左右反転した法線との判定は、視点のxの符号を反転した判定と等しい（helper.get_normal_axis_from_view_3d）
+    rng = np.random.RandomState(1)
+    edge_normals = (rng.rand(100, 3) * 2 - 1).astype(np.float32)
+    axis = np.array([0.6, 0.2, -0.7], dtype = np.float32)
+    flip = np.array([-1, 1, 1], dtype = np.float32)
+    expected = core.classify_edge_normals(edge_normals * flip, axis)
+    actual = core.classify_edge_normals(edge_normals, axis * flip)
+    np.testing.assert_array_equal(actual[0], expected[0])
+    np.testing.assert_array_equal(actual[1], expected[1])
+
+def test_edge_vertex_arrays_match_cpu_classification():
+    rng = np.random.RandomState(2)
+    coords = rng.rand(20, 3).astype(np.float32)
+    normals = (rng.rand(20, 3) * 2 - 1).astype(np.float32)
+    edges = rng.randint(0, 20, (50, 2)).astype(np.int32)
+    edge_normals = core.get_edge_normals(normals, edges)
+    points, vertex_normals = core.get_edge_vertex_arrays(coords, edges, edge_normals)
+    indices = core.get_edge_vertex_indices(len(edges))
+    np.testing.assert_array_equal(points[indices], coords[edges])
+    # 辺の両端は同じ法線を持つため、シェーダーでの判定は辺の途中で切り替わらない
+    np.testing.assert_array_equal(vertex_normals[indices[:, 0]], vertex_normals[indices[:, 1]])
+    axis = np.array([0.2, -0.4, 0.9], dtype = np.float32)
+    front, _ = core.classify_edge_normals(edge_normals, axis)
+    np.testing.assert_array_equal(vertex_normals[indices[:, 0]].dot(axis) >= 0, front)
+
+def test_edge_vertex_indices_subset():
+    indices = core.get_edge_vertex_indices(5, np.array([1, 3]))
+    np.testing.assert_array_equal(indices, [[2, 3], [6, 7]])
+
+# --- build_edge_grid / get_visible_edges_from_grid ---
+
+def is_edge_in_frustum(coords, edges, matrix, samples = 17):
+    # 辺上の点を調べ、いずれかがクリップ座標の範囲内にあるか
+    t = np.linspace(0, 1, samples, dtype = np.float32)[:, None, None]
+    points = coords[edges[:, 0]] * (1 - t) + coords[edges[:, 1]] * t
+    clip = points @ matrix[:, :3].T + matrix[:, 3]
+    w = clip[..., 3]
+    inside = np.all(np.abs(clip[..., :3]) <= w[..., None], axis = -1)
+    return inside.any(axis = 0)
+
+@pytest.mark.parametrize("seed", range(8))
+def test_visible_edges_are_never_culled(seed):
+    coords, edges = random_mesh(seed)
+    grid = core.build_edge_grid(coords, edges)
+    rng = np.random.RandomState(100 + seed)
+    for _ in range(10):
+        eye = (rng.rand(3) * 40 - 20).astype(np.float32)
+        target = (rng.rand(3) * 10 - 5).astype(np.float32)
+        matrix = perspective_matrix(fov = rng.uniform(0.3, 1.5)) @ look_at_matrix(eye, target)
+        visible = core.get_visible_edges_from_grid(grid, matrix)
+        expected = is_edge_in_frustum(coords, edges, matrix)
+        assert not np.any(expected & ~visible)
+
+def test_edges_outside_frustum_are_culled():
+    coords, edges = random_mesh(0)
+    grid = core.build_edge_grid(coords, edges)
+    # すべての辺がカメラの後ろにある
+    matrix = perspective_matrix() @ look_at_matrix((0, 0, 50), (0, 0, 100))
+    assert not core.get_visible_edges_from_grid(grid, matrix).any()
+
+def test_empty_edge_grid():
+    grid = core.build_edge_grid(np.zeros((0, 3), dtype = np.float32), np.zeros((0, 2), dtype = np.int32))
+    visible = core.get_visible_edges_from_grid(grid, np.eye(4))
+    assert visible.shape == (0,)
+
+# --- get_next_edge_index ---
+
+def test_next_edge_index_without_lod_or_culling():
+    edge_index, count, total = core.get_next_edge_index(10, None, 0, 4, 4, 100)
+    assert edge_index is None
+    assert (count, total) == (10, 10)
+
+def test_next_edge_index_visible_only():
+    visible = np.array([True, False, True, True, False])
+    edge_index, count, total = core.get_next_edge_index(5, None, 0, 2, 2, 100, visible)
+    np.testing.assert_array_equal(edge_index, [0, 2, 3])
+    assert (count, total) == (3, 3)
+
+def test_next_edge_index_lod_within_budget_draws_all():
+    lod_order = core.get_lod_order(10)
+    edge_index, count, total = core.get_next_edge_index(10, lod_order, 0, 10, 1, 100)
+    assert edge_index is None
+    assert (count, total) == (10, 10)
+
+def refine_counts(edge_count, lod_budget, lod_step, lod_limit):
+    lod_order = core.get_lod_order(edge_count)
+    counts = []
+    lod_count = 0
+    while True:
+        edge_index, lod_count, limit = core.get_next_edge_index(edge_count, lod_order, lod_count, lod_budget, lod_step, lod_limit)
+        np.testing.assert_array_equal(edge_index, lod_order[:lod_count])
+        counts.append(lod_count)
+        if lod_count >= limit:
+            return counts
+
+def test_next_edge_index_lod_refines_by_step():
+    assert refine_counts(10, 4, 4, 100) == [4, 8, 10]
+    # 最初の辺の数と増やす数は別に指定できる
+    assert refine_counts(10, 2, 5, 100) == [2, 7, 10]
+
+def test_next_edge_index_lod_stops_at_limit():
+    assert refine_counts(100, 10, 20, 45) == [10, 30, 45]
+    # 上限が予算より小さい場合は予算の数のまま増やさない
+    assert refine_counts(100, 10, 20, 5) == [10]
+
+def test_next_edge_index_lod_with_visible():
+    lod_order = core.get_lod_order(10)
+    visible = np.arange(10) % 2 == 0
+    edge_index, count, total = core.get_next_edge_index(10, lod_order, 0, 3, 3, 100, visible)
+    assert (count, total) == (3, 5)
+    assert visible[edge_index].all()
+    # LODの順番を保ったまま見える辺のみ取り出す
+    np.testing.assert_array_equal(edge_index, lod_order[visible[lod_order]][:3])
+
+    edge_index, count, total = core.get_next_edge_index(10, lod_order, count, 3, 3, 100, visible)
+    assert (count, total) == (5, 5)
+    np.testing.assert_array_equal(np.sort(edge_index), np.flatnonzero(visible))
+
+def test_next_edge_index_lod_with_visible_within_budget():
+    lod_order = core.get_lod_order(10)
+    visible = np.zeros(10, dtype = bool)
+    visible[[1, 7]] = True
+    edge_index, count, total = core.get_next_edge_index(10, lod_order, 0, 3, 3, 100, visible)
+    np.testing.assert_array_equal(edge_index, [1, 7])
+    assert (count, total) == (2, 2)
+
+def test_lod_order_is_permutation():
+    lod_order = core.get_lod_order(50)
+    np.testing.assert_array_equal(np.sort(lod_order), np.arange(50))
+    np.testing.assert_array_equal(lod_order, core.get_lod_order(50))
+
+# --- get_edge_chains ---
+
+def chain_edges(points):
+    return np.stack([points[:-1], points[1:]], axis = 1)
+
+def test_edge_chains_closed_loop():
+    square = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 0]], dtype = np.float32)
+    chains = core.get_edge_chains(chain_edges(square))
+    assert len(chains) == 1
+    chain = chains[0]
+    assert len(chain) == 5
+    np.testing.assert_array_equal(chain[0], chain[-1])
+    assert {tuple(p) for p in chain.tolist()} == {tuple(p) for p in square.tolist()}
+
+def test_edge_chains_open_polyline():
+    line = np.array([[0, 0, 0], [1, 0, 0], [2, 0, 0], [3, 0, 0]], dtype = np.float32)
+    # 辺の順番・向きがばらばらでも一本にまとまる
+    edge_coords = chain_edges(line)[[2, 0, 1]]
+    edge_coords[0] = edge_coords[0][::-1]
+    chains = core.get_edge_chains(edge_coords)
+    assert len(chains) == 1
+    chain = chains[0]
+    if chain[0][0] != 0:
+        chain = chain[::-1]
+    np.testing.assert_array_equal(chain, line)
+
+def test_edge_chains_t_junction():
+    center = [0, 0, 0]
+    edge_coords = np.array([
+        [[-1, 0, 0], center],
+        [center, [1, 0, 0]],
+        [center, [0, 1, 0]],
+    ], dtype = np.float32)
+    chains = core.get_edge_chains(edge_coords)
+    # 分岐点で区切られ、すべての折れ線が分岐点を端に持つ
+    assert len(chains) == 3
+    assert sum(len(chain) - 1 for chain in chains) == 3
+    for chain in chains:
+        assert center in (chain[0].tolist(), chain[-1].tolist())
+
+def test_edge_chains_skip_zero_length_edge():
+    edge_coords = np.array([
+        [[0, 0, 0], [1, 0, 0]],
+        [[1, 0, 0], [1, 0, 0]],
+        [[1, 0, 0], [2, 0, 0]],
+    ], dtype = np.float32)
+    chains = core.get_edge_chains(edge_coords)
+    assert len(chains) == 1
+    assert len(chains[0]) == 3
+
+def test_edge_chains_only_zero_length_edges():
+    assert core.get_edge_chains(np.array([[[1, 2, 3], [1, 2, 3]]], dtype = np.float32)) == []
+
+def test_edge_chains_empty():
+    assert core.get_edge_chains(np.zeros((0, 2, 3), dtype = np.float32)) == []
+
+# --- build_point_grid / find_nearest_points ---
+
+def test_find_nearest_points_within_tolerance():
+    rng = np.random.RandomState(0)
+    points = rng.rand(500, 3) * 10
+    tolerance = 0.01
+    grid = core.build_point_grid(points, tolerance)
+    queries = points[[3, 10, 250]] + np.array([0.004, -0.003, 0.002])
+    np.testing.assert_array_equal(core.find_nearest_points(points, grid, queries, tolerance), [3, 10, 250])
+
+def test_find_nearest_points_picks_closest():
+    points = np.array([[0, 0, 0], [0.5, 0, 0], [1, 0, 0]])
+    grid = core.build_point_grid(points, 1.0)
+    queries = np.array([[0.4, 0, 0], [0.8, 0, 0], [0.1, 0, 0]])
+    np.testing.assert_array_equal(core.find_nearest_points(points, grid, queries, 1.0), [1, 2, 0])
+
+def test_find_nearest_points_zero_tolerance():
+    points = np.array([[0, 0, 0], [1, 2, 3], [4, 5, 6]], dtype = np.float32)
+    # 許容誤差が0の場合も格子の大きさは0にできない（Annotate.AnnotateSelectCache と同じ）
+    grid = core.build_point_grid(points, 1e-6)
+    queries = np.array([[1, 2, 3], [1, 2, 3.001], [4, 5, 6]], dtype = np.float32)
+    np.testing.assert_array_equal(core.find_nearest_points(points, grid, queries, 0.0), [1, -1, 2])
+
+def test_find_nearest_points_misses():
+    points = np.array([[0, 0, 0], [1, 0, 0]])
+    tolerance = 0.1
+    grid = core.build_point_grid(points, tolerance)
+    queries = np.array([[0.5, 0, 0], [0, 0.15, 0], [100, 100, 100], [-100, 0, 0]])
+    np.testing.assert_array_equal(core.find_nearest_points(points, grid, queries, tolerance), [-1, -1, -1, -1])
+
+def test_find_nearest_points_empty():
+    grid = core.build_point_grid(np.zeros((0, 3)), 0.1)
+    np.testing.assert_array_equal(core.find_nearest_points(np.zeros((0, 3)), grid, [[0, 0, 0]], 0.1), [-1])
+    grid = core.build_point_grid([[0, 0, 0]], 0.1)
+    assert len(core.find_nearest_points([[0, 0, 0]], grid, np.zeros((0, 3)), 0.1)) == 0
+
+def test_find_nearest_points_matches_brute_force():
+    rng = np.random.RandomState(2)
+    points = rng.rand(300, 3)
+    queries = rng.rand(200, 3)
+    tolerance = 0.05
+    grid = core.build_point_grid(points, tolerance)
+    dist = np.linalg.norm(queries[:, None] - points[None], axis = -1)
+    expected = np.where(dist.min(axis = 1) <= tolerance, dist.argmin(axis = 1), -1)
+    np.testing.assert_array_equal(core.find_nearest_points(points, grid, queries, tolerance), expected)
+
+def test_find_nearest_points_chunks_match_single_pass():
+    rng = np.random.RandomState(3)
+    points = rng.rand(300, 3)
+    queries = rng.rand(200, 3)
+    grid = core.build_point_grid(points, 0.05)
+    expected = core.find_nearest_points(points, grid, queries, 0.05, chunk_size = len(queries))
+    # 問い合わせの数で割り切れない大きさに分けても結果は同じ
+    np.testing.assert_array_equal(core.find_nearest_points(points, grid, queries, 0.05, chunk_size = 7), expected)
+
+# --- find_edges ---
+
+def test_find_edges_reversed_pairs():
+    edges = np.array([[0, 1], [1, 2], [3, 2], [4, 0]])
+    pairs = np.array([[1, 0], [2, 1], [2, 3], [0, 4]])
+    np.testing.assert_array_equal(core.find_edges(edges, pairs, 5), [0, 1, 2, 3])
+
+def test_find_edges_missing():
+    edges = np.array([[0, 1], [1, 2], [3, 2]])
+    pairs = np.array([[0, 2], [1, 2], [3, 4], [4, 4]])
+    np.testing.assert_array_equal(core.find_edges(edges, pairs, 5), [-1, 1, -1, -1])
+
+def test_find_edges_empty():
+    np.testing.assert_array_equal(core.find_edges(np.zeros((0, 2)), [[0, 1]], 2), [-1])
+    assert len(core.find_edges([[0, 1]], np.zeros((0, 2)), 2)) == 0
@@ -0,0 +1,480 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bpy
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from bpy.app.handlers import persistent
+from time import perf_counter
+from .helper import *
+from .mesh_helpers import *
+from .wire_hud import *
+from .Annotate import AnnotateSelectCache
+
+class WireCacheEntry():
+    """対象ごとのエッジの抽出結果と描画用バッチ
+    """
+    def __init__(self, key):
+        # 抽出時のキー（メッシュ・モディファイア）
+        # 左右反転・透過は描画時に切り替えるため含めない
+        self.key = key
+        # 対象のメッシュ名（メッシュ側の更新通知を対象に結びつけるため）
+        self.mesh_name = None
+        # 形状・変形の更新通知を受けたか
+        self.is_dirty_geometry = False
+        self.is_dirty_transform = False
+        # ワールド行列（描画時にモデル行列として適用する）
+        self.matrix = None
+        # 頂点座標（ローカル座標） (V, 3) float32
+        self.coords = None
+        # 辺の頂点インデックス (E, 2) int32
+        self.edges = None
+        # 頂点の法線 (V, 3) float32
+        self.normals = None
+        # 辺の法線（両端の頂点法線の和） (E, 3) float32
+        self.edge_normals = None
+        # LOD用の辺の描画順（間引いても全体に散らばるよう並べ替えたもの）
+        self.lod_order = None
+        # LODで現在描画している辺の数と、最終的に描画する辺の数
+        self.lod_count = 0
+        self.lod_total = 0
+        # 視錐台カリング用の格子
+        self.edge_grid = None
+        # 頂点の移動のたびに増やす番号（頂点バッファを転送し直すかの判定に使う）
+        self.geometry_version = 0
+        # 頂点バッファ（前後の辺のバッチで共有する）と、転送した時の番号
+        self.vbo = None
+        self.vbo_version = 0
+        # GPUで前後判定する場合の頂点バッファ（座標と法線）
+        self.vbo_facing = None
+        self.vbo_facing_version = 0
+        # GPUで前後判定する場合のインデックスのバッファ（頂点の移動のみの場合は使いまわす）
+        self.ibo_facing = None
+        # バッチ作成時の視点
+        self.batch_key = None
+        self.batch = None
+        self.batch_xray = None
+        # 描画している辺の数
+        self.drawn_count = 0
+        # 前回の前後判定・バッチ作成の時刻と、かかった時間（視点の移動中に判定を間引くか決める）
+        self.rebuild_time = 0.0
+        self.rebuild_seconds = 0.0
+        # 最後に変わった視点とその時刻（視点が止まったかを判定する）
+        self.last_view_key = None
+        self.last_view_time = 0.0
+        # GPUで前後判定する場合のバッチ（視点によらないため形状が変わるまで使いまわす）
+        self.batch_facing = None
+
+class WireCacheRequest():
+    """描画ハンドラの外で行う抽出の要求
+    """
+    def __init__(self, key, reason, is_modifier, is_culling, is_lod):
+        self.key = key
+        # 抽出し直す理由（HUDに表示する）
+        self.reason = reason
+        self.is_modifier = is_modifier
+        self.is_culling = is_culling
+        self.is_lod = is_lod
+        self.mesh_name = None
+        # 抽出後の計算を行うワーカースレッドの結果
+        self.future = None
+        # 抽出後に対象が更新されたか（完了後にもう一度抽出する）
+        self.is_stale = False
+        # メインスレッドでの抽出とワーカースレッドでの計算にかかった時間
+        self.extract_seconds = 0.0
+        self.build_seconds = 0.0
+
+class WireCache():
+    """再描画のたびにメッシュを抽出しないよう、対象ごとに抽出結果を保持する
+    抽出はタイマーで描画ハンドラの外で行い、完了するまでは前回の抽出結果を描画する
+    """
+    # 描画に使う抽出結果（完了したもののみ）
+    entries = {}
+    # 抽出中の要求
+    requests = {}
+    # モディファイア評価後の形状（更新の通知があるまで使いまわす）
+    evaluated = {}
+    # 抽出に失敗したキー（更新の通知があるまでは抽出し直さない）
+    failed = {}
+    # 計算中の視錐台カリング用の格子・LODの描画順（対象, 計算元の頂点, 計算元の辺, ワーカースレッドの結果）
+    derived = {}
+    executor = None
+
+    @classmethod
+    def get_key(self, obj, prop):
+        return (
+            obj.data.as_pointer(),
+            prop.cw_is_modifier,
+        )
+
+    @classmethod
+    def get_entry(self, obj, prop):
+        """描画に使う抽出結果を取得する（一度も抽出が完了していない場合はNone）
+        """
+        key = self.get_key(obj, prop)
+        entry = self.entries.get(obj.name)
+        reason = None
+        if entry is None:
+            reason = "new"
+        elif entry.key != key:
+            reason = "settings"
+        elif entry.is_dirty_geometry:
+            reason = "geometry"
+        # 失敗した場合は、更新の通知があるまで描画のたびに抽出し直さない
+        if reason is not None and self.failed.get(obj.name) != key:
+            self.request(obj, prop, key, reason)
+        WireHud.record_cache(obj.name, reason)
+
+        if entry is None:
+            return None
+
+        # 変形のみの更新は座標を抽出し直さず、モデル行列だけ差し替える
+        if entry.is_dirty_transform:
+            entry.matrix = obj.matrix_world.copy()
+            entry.is_dirty_transform = False
+        return entry
+
+    @classmethod
+    def request(self, obj, prop, key, reason):
+        request = self.requests.get(obj.name)
+        if request is not None:
+            # 抽出中に設定が変わった場合は、完了後にもう一度抽出する
+            if request.key != key:
+                request.is_stale = True
+            return
+
+        self.requests[obj.name] = WireCacheRequest(key, reason, prop.cw_is_modifier, prop.cw_is_culling, prop.cw_is_lod)
+        if not bpy.app.timers.is_registered(wire_cache_timer):
+            bpy.app.timers.register(wire_cache_timer)
+
+    @classmethod
+    def process_requests(self):
+        """タイマーから呼ばれ、要求された抽出を行う
+        bpyへのアクセスはメインスレッドで行い、numpyでの計算のみワーカースレッドで行う
+        """
+        for name, request in list(self.requests.items()):
+            if request.future is None:
+                obj = bpy.data.objects.get(name)
+                if obj is None or obj.type != 'MESH':
+                    del self.requests[name]
+                    continue
+
+                # 編集中は変更された頂点のみ差し替える（差し替えはメインスレッドで行うため描画と競合しない）
+                entry = self.entries.get(name)
+                if entry is not None and entry.key == request.key and obj.mode == 'EDIT' and not (request.is_modifier and obj.modifiers):
+                    del self.requests[name]
+                    start = perf_counter()
+                    try:
+                        self.update_edit_entry(obj, entry)
+                    except Exception as e:
+                        print("ConfirmWire: failed to update edit mesh.", e)
+                        self.failed[name] = request.key
+                        continue
+                    WireHud.record_extract(name, "edit", perf_counter() - start)
+                    area_3d_view_tag_redraw_windows()
+                    continue
+
+                # ワールド行列・左右反転は描画時に適用するため、ローカル座標のまま抽出する
+                request.mesh_name = obj.data.name
+                matrix = obj.matrix_world.copy()
+                start = perf_counter()
+                try:
+                    if request.is_modifier and obj.modifiers:
+                        coords, edges, normals = self.get_evaluated_arrays(obj)
+                    else:
+                        coords, edges, normals = mesh_arrays_from_object(obj)
+                except Exception as e:
+                    print("ConfirmWire: failed to extract mesh.", e)
+                    self.failed[name] = request.key
+                    del self.requests[name]
+                    continue
+                request.extract_seconds = perf_counter() - start
+                request.future = self.get_executor().submit(self.create_entry, request, matrix, coords, edges, normals)
+
+            elif request.future.done():
+                del self.requests[name]
+                try:
+                    entry = request.future.result()
+                except Exception as e:
+                    print("ConfirmWire: failed to build wire cache.", e)
+                    self.failed[name] = request.key
+                    continue
+
+                # 完成したものと入れ替える（計算中に変形された場合に備えて行列は描画時に取得し直す）
+                entry.is_dirty_geometry = request.is_stale
+                entry.is_dirty_transform = True
+                self.entries[name] = entry
+                WireHud.record_extract(name, request.reason, request.extract_seconds, request.build_seconds)
+                area_3d_view_tag_redraw_windows()
+
+        self.process_derived()
+        return 0.01 if self.requests or self.derived else None
+
+    @classmethod
+    def is_derived_ready(self, name, entry, is_culling, is_lod):
+        """視錐台カリング用の格子・LODの描画順が揃っているか
+        揃っていない場合は描画ハンドラの中では作成せず、ワーカースレッドでの計算を要求する
+        """
+        is_grid = is_culling and entry.edge_grid is None
+        is_lod = is_lod and entry.lod_order is None
+        if not is_grid and not is_lod:
+            return True
+        self.request_derived(name, entry, is_grid, is_lod)
+        return False
+
+    @classmethod
+    def request_derived(self, name, entry, is_grid, is_lod):
+        if self.failed.get(name) == entry.key:
+            return
+        derived = self.derived.get(name)
+        if derived is not None and derived[0] is entry and derived[1] is entry.coords and derived[2] is entry.edges:
+            return
+
+        future = self.get_executor().submit(self.create_derived, entry.coords, entry.edges, is_grid, is_lod)
+        self.derived[name] = (entry, entry.coords, entry.edges, future)
+        if not bpy.app.timers.is_registered(wire_cache_timer):
+            bpy.app.timers.register(wire_cache_timer)
+
+    @classmethod
+    def create_derived(self, coords, edges, is_grid, is_lod):
+        """ワーカースレッドで呼ばれるため、bpyにはアクセスしない
+        """
+        edge_grid = build_edge_grid(coords, edges) if is_grid else None
+        lod_order = get_lod_order(len(edges)) if is_lod else None
+        return edge_grid, lod_order
+
+    @classmethod
+    def process_derived(self):
+        for name, (entry, coords, edges, future) in list(self.derived.items()):
+            if not future.done():
+                continue
+            del self.derived[name]
+            try:
+                edge_grid, lod_order = future.result()
+            except Exception as e:
+                print("ConfirmWire: failed to build wire cache.", e)
+                self.failed[name] = entry.key
+                continue
+
+            # 計算中に頂点・辺が差し替えられた場合は使わない（次の描画で要求し直す）
+            if self.entries.get(name) is not entry:
+                continue
+            if edge_grid is not None and entry.coords is coords and entry.edges is edges:
+                entry.edge_grid = edge_grid
+            if lod_order is not None and entry.edges is edges:
+                entry.lod_order = lod_order
+            area_3d_view_tag_redraw_windows()
+
+    @classmethod
+    def get_evaluated_arrays(self, obj):
+        """モディファイア評価後の形状を取得する
+        設定の切り替えなどで抽出し直す場合も、形状の更新の通知があるまでは評価し直さない
+        """
+        key = (obj.data.as_pointer(), obj.mode)
+        snapshot = self.evaluated.get(obj.name)
+        if snapshot is None or snapshot[0] != key:
+            snapshot = (key, mesh_arrays_from_object(obj, True))
+            self.evaluated[obj.name] = snapshot
+        return snapshot[1]
+
+    @classmethod
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers = 1)
+        return self.executor
+
+    @classmethod
+    def create_entry(self, request, matrix, coords, edges, normals):
+        """ワーカースレッドで呼ばれるため、bpyにはアクセスしない
+        """
+        start = perf_counter()
+        entry = WireCacheEntry(request.key)
+        entry.mesh_name = request.mesh_name
+        entry.matrix = matrix
+        self.set_entry_arrays(entry, coords, edges, normals)
+
+        # 描画中に作成しないよう、使うものは先に作成しておく
+        if request.is_culling:
+            entry.edge_grid = build_edge_grid(coords, edges)
+        if request.is_lod:
+            entry.lod_order = get_lod_order(len(edges))
+        request.build_seconds = perf_counter() - start
+        return entry
+
+    @classmethod
+    def update_edit_entry(self, obj, entry):
+        entry.is_dirty_geometry = False
+        bm = from_edit_mesh(obj.data)
+
+        # 頂点・辺の数が変わった場合はすべて抽出し直す
+        if len(bm.verts) != len(entry.coords) or len(bm.edges) != len(entry.edges):
+            coords, edges, normals = mesh_arrays_from_bmesh(bm)
+            self.set_entry_arrays(entry, coords, edges, normals)
+            return
+
+        coords, normals = bmesh_vertex_arrays(bm)
+
+        # 並べ替え・元に戻すなどでは、数が同じでも辺のつながりが変わる場合がある
+        edges = bmesh_edge_array(bm)
+        if not np.array_equal(edges, entry.edges):
+            self.set_entry_arrays(entry, coords, edges, normals)
+            return
+
+        # 選択などの頂点が変わらない更新は何もしない
+        changed = np.any(coords != entry.coords, axis = 1) | np.any(normals != entry.normals, axis = 1)
+        if not changed.any():
+            return
+
+        # 移動などで頂点が変わった場合は、頂点と接する辺の法線のみ計算し直す
+        # ワーカースレッドが参照している場合があるため、配列は書き換えずに差し替える
+        edge_changed = changed[edges[:, 0]] | changed[edges[:, 1]]
+        edge_normals = entry.edge_normals.copy()
+        edge_normals[edge_changed] = get_edge_normals(normals, edges[edge_changed])
+        entry.coords = coords
+        entry.normals = normals
+        entry.edge_normals = edge_normals
+        entry.edge_grid = None
+
+        # 辺のつながりは変わらないため、LODの描画順とGPUでの判定のインデックスは使いまわす
+        entry.geometry_version += 1
+        entry.batch_key = None
+
+    @classmethod
+    def set_entry_arrays(self, entry, coords, edges, normals):
+        entry.coords = coords
+        entry.edges = edges
+        entry.normals = normals
+        entry.edge_normals = get_edge_normals(normals, edges)
+        entry.lod_order = None
+        entry.edge_grid = None
+        self.clear_entry_batch(entry)
+
+    @classmethod
+    def clear_entry_batch(self, entry):
+        entry.vbo = None
+        entry.vbo_facing = None
+        entry.ibo_facing = None
+        entry.batch_key = None
+        entry.drawn_count = 0
+        entry.batch = None
+        entry.batch_xray = None
+        entry.batch_facing = None
+        entry.lod_count = 0
+        entry.lod_total = 0
+
+    @classmethod
+    def next_edge_index(self, entry, prop, visible = None):
+        """次に描画する辺のインデックスを取得する（Noneの場合はすべての辺を描画する）
+        visible は視錐台カリングで見えると判定された辺
+        """
+        lod_order = entry.lod_order if prop.cw_is_lod else None
+        edge_index, entry.lod_count, entry.lod_total = get_next_edge_index(
+            len(entry.edges), lod_order, entry.lod_count, prop.cw_lod_budget, prop.cw_lod_step, prop.cw_lod_limit, visible)
+        return edge_index
+
+    @classmethod
+    def is_lod_refining(self, entry):
+        return entry.lod_count < entry.lod_total
+
+    @classmethod
+    def remove(self, obj):
+        for cache in (self.entries, self.requests, self.evaluated, self.failed, self.derived):
+            cache.pop(obj.name, None)
+
+    @classmethod
+    def retain(self, names):
+        """指定したオブジェクト以外のキャッシュを破棄する
+        """
+        for cache in (self.entries, self.requests, self.evaluated, self.failed, self.derived):
+            for name in list(cache):
+                if name not in names:
+                    del cache[name]
+
+    @classmethod
+    def clear(self):
+        for cache in (self.entries, self.requests, self.evaluated, self.failed, self.derived):
+            cache.clear()
+
+    @classmethod
+    def on_depsgraph_update(self, depsgraph):
+        if not self.entries and not self.requests and not self.evaluated and not self.failed:
+            return
+
+        for update in depsgraph.updates:
+            if not (update.is_updated_geometry or update.is_updated_transform):
+                continue
+
+            # 評価後のIDで通知されるため、元のIDで対象を探す
+            id = update.id.original
+            if isinstance(id, bpy.types.Object):
+                names = [id.name]
+            elif isinstance(id, bpy.types.Mesh):
+                names = [name for name, entry in self.entries.items() if entry.mesh_name == id.name]
+                names += [name for name, request in self.requests.items() if request.mesh_name == id.name]
+                names += [name for name in self.failed if bpy.data.objects.get(name) is not None and bpy.data.objects[name].data == id]
+            else:
+                continue
+
+            for name in names:
+                # 失敗した対象も、更新されたら抽出し直す
+                self.failed.pop(name, None)
+                # モディファイア評価後の形状も変わるため破棄する
+                if update.is_updated_geometry:
+                    self.evaluated.pop(name, None)
+
+                # 抽出済みで計算中の要求は、完了後にもう一度抽出する
+                request = self.requests.get(name)
+                if request is not None and request.future is not None and update.is_updated_geometry:
+                    request.is_stale = True
+
+                entry = self.entries.get(name)
+                if entry is None:
+                    continue
+                # モディファイアの変更も形状の更新として通知される
+                if update.is_updated_geometry:
+                    entry.is_dirty_geometry = True
+                if update.is_updated_transform:
+                    entry.is_dirty_transform = True
+
+    @classmethod
+    def register(self):
+        for handlers in (bpy.app.handlers.depsgraph_update_post, bpy.app.handlers.frame_change_post):
+            if wire_cache_depsgraph_update_post not in handlers:
+                handlers.append(wire_cache_depsgraph_update_post)
+
+    @classmethod
+    def unregister(self):
+        for handlers in (bpy.app.handlers.depsgraph_update_post, bpy.app.handlers.frame_change_post):
+            if wire_cache_depsgraph_update_post in handlers:
+                handlers.remove(wire_cache_depsgraph_update_post)
+        if bpy.app.timers.is_registered(wire_cache_timer):
+            bpy.app.timers.unregister(wire_cache_timer)
+        if self.executor is not None:
+            self.executor.shutdown(wait = False)
+            self.executor = None
+        self.clear()
+
+# 対象の形状・変形が更新されたらキャッシュを無効にする（再生中のフレーム変更も含む）
+@persistent
+def wire_cache_depsgraph_update_post(scene, depsgraph = None):
+    # 古いバージョンでは引数にdepsgraphが渡されない
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    WireCache.on_depsgraph_update(depsgraph)
+    # アノテートから選択する際の検索用データも同じ通知で無効にする
+    AnnotateSelectCache.on_depsgraph_update(depsgraph)
+
+# 要求された抽出を描画ハンドラの外で行う
+def wire_cache_timer():
+    return WireCache.process_requests()
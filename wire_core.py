@@ -0,0 +1,261 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# 辺の前後判定・カリング・間引きの計算（bpy・mathutilsに依存しないため、Blenderの外でも計測できる）
+# 入力はnumpyの配列、行列・ベクトルは配列に変換できるもの（mathutilsのMatrix・Vectorも可）
+
+import numpy as np
+
+# 辺の法線（両端の頂点法線の和）を求める
+# 辺の中点での法線と同じ向きになるため、前後判定にはこれを使う
+def get_edge_normals(normals, edges):
+    return normals[edges[:, 0]] + normals[edges[:, 1]]
+
+# 法線と比較する向き axis (3,) から、法線が外側である辺(front)と内側である辺(back)をまとめて判定する
+def classify_edge_normals(edge_normals, axis):
+    back = edge_normals.dot(np.asarray(axis, dtype = np.float32)) < 0
+    return ~back, back
+
+# 視錐台カリング用に、辺の中点で格子に分けて格子ごとの範囲を求める（形状が変わるまで使いまわす）
+# 戻り値は辺ごとの格子番号 (E,)、格子ごとの範囲の最小 (C, 3) と最大 (C, 3)
+def build_edge_grid(coords, edges, edges_per_cell = 64, max_resolution = 32):
+    if len(edges) == 0:
+        return np.zeros(0, dtype = np.int32), np.zeros((0, 3), dtype = np.float32), np.zeros((0, 3), dtype = np.float32)
+
+    v1 = coords[edges[:, 0]]
+    v2 = coords[edges[:, 1]]
+    mid = (v1 + v2) * 0.5
+
+    resolution = int(min(max_resolution, max(1, round((len(edges) / edges_per_cell) ** (1 / 3)))))
+    lo = mid.min(axis = 0)
+    size = np.maximum(mid.max(axis = 0) - lo, 1e-6)
+    cell_xyz = np.minimum(((mid - lo) / size * resolution).astype(np.int32), resolution - 1)
+    cell = (cell_xyz[:, 0] * resolution + cell_xyz[:, 1]) * resolution + cell_xyz[:, 2]
+
+    # 辺が含まれる格子のみ残し、格子ごとに辺の両端を含む範囲を求める
+    _, edge_cell = np.unique(cell, return_inverse = True)
+    edge_cell = edge_cell.reshape(-1).astype(np.int32)
+    order = np.argsort(edge_cell, kind = 'stable')
+    starts = np.flatnonzero(np.r_[True, np.diff(edge_cell[order]) != 0])
+    cell_min = np.minimum.reduceat(np.minimum(v1, v2)[order], starts, axis = 0)
+    cell_max = np.maximum.reduceat(np.maximum(v1, v2)[order], starts, axis = 0)
+    return edge_cell, cell_min, cell_max
+
+# 格子ごとに視錐台の外にあるかを判定し、視錐台の中にある辺を取得する
+# matrix はローカル座標からクリップ座標への行列 (4, 4)
+def get_visible_edges_from_grid(edge_grid, matrix):
+    edge_cell, cell_min, cell_max = edge_grid
+    m = np.array(matrix, dtype = np.float32)
+
+    # 格子の範囲の8つの角をクリップ座標に変換する (8, C, 4)
+    corners = np.stack([np.where(np.array([i & 1, i & 2, i & 4], dtype = bool), cell_max, cell_min) for i in range(8)])
+    clip = corners @ m[:, :3].T + m[:, 3]
+    x, y, z, w = clip[..., 0], clip[..., 1], clip[..., 2], clip[..., 3]
+
+    # すべての角が同じ面の外側にある格子は見えない
+    outside = (
+        np.all(x < -w, axis = 0) | np.all(x > w, axis = 0) |
+        np.all(y < -w, axis = 0) | np.all(y > w, axis = 0) |
+        np.all(z < -w, axis = 0) | np.all(z > w, axis = 0))
+    return ~outside[edge_cell]
+
+# 間引いて描画する順番（並べ替えた順に先頭から取り出すことで、一定間隔で間引いたような辺になる）
+def get_lod_order(edge_count, seed = 0):
+    return np.random.RandomState(seed).permutation(edge_count).astype(np.int32)
+
+# 次に描画する辺のインデックスと、描画済みの数・描画する辺の上限を求める
+# インデックスがNoneの場合はすべての辺を描画する、visible は視錐台カリングで見えると判定された辺
+# lod_budget 以下の辺はすべて描画し、超える場合は lod_budget から lod_step ずつ lod_limit まで辺を増やす
+def get_next_edge_index(edge_count, lod_order, lod_count, lod_budget, lod_step, lod_limit, visible = None):
+    edge_index = None if visible is None else np.flatnonzero(visible)
+    total = edge_count if edge_index is None else len(edge_index)
+    if lod_order is None or total <= lod_budget:
+        return edge_index, total, total
+
+    order = lod_order if visible is None else lod_order[visible[lod_order]]
+
+    # 最初は予算の数だけ描画し、以降は描画のたびに上限まで辺を増やしていく
+    limit = min(total, max(lod_budget, lod_limit))
+    count = lod_budget if lod_count == 0 else min(limit, lod_count + lod_step)
+    return order[:count], count, limit
+
+# 辺の両端をワールド座標に変換する（戻り値は (N, 2, 3)）
+# matrix はローカル座標からワールド座標への行列 (4, 4)
+def get_edge_coords(coords, edges, matrix = None):
+    points = coords[edges.reshape(-1)].astype(np.float32, copy = False)
+    if matrix is not None:
+        points = get_transformed_coords(points, matrix)
+    return points.reshape(-1, 2, 3)
+
+# GPUでの前後判定用に、辺ごとに頂点を分けて両端に辺の法線を持たせる
+# 頂点を共有すると線の上で頂点法線が補間され、輪郭の辺が途中で前後に分かれるため（CPUでの判定と揃える）
+# 戻り値は辺 i の両端が 2i, 2i+1 番目となる座標 (2E, 3) と法線 (2E, 3)
+def get_edge_vertex_arrays(coords, edges, edge_normals):
+    points = get_edge_coords(coords, edges).reshape(-1, 3)
+    return points, np.repeat(edge_normals.astype(np.float32, copy = False), 2, axis = 0)
+
+# get_edge_vertex_arrays の頂点に対する辺のインデックス (N, 2) を求める（edge_index が None の場合はすべての辺）
+def get_edge_vertex_indices(edge_count, edge_index = None):
+    if edge_index is None:
+        edge_index = np.arange(edge_count)
+    first = np.asarray(edge_index, dtype = np.int32) * 2
+    return np.stack((first, first + 1), axis = 1)
+
+# 座標 (N, 3) を行列 (4, 4) で変換する
+def get_transformed_coords(coords, matrix):
+    m = np.array(matrix, dtype = np.float32)
+    return coords @ m[:3, :3].T + m[:3, 3]
+
+# つながった辺を折れ線にまとめる（アノテートのストロークを辺ごとではなく折れ線ごとに作成する）
+# edge_coords は (N, 2, 3) の辺の両端の座標、同じ座標の端点はつながっているものとする
+# 戻り値は折れ線ごとの座標 (K, 3) の一覧（閉じた折れ線は始点と終点が同じになる）
+def get_edge_chains(edge_coords):
+    edge_coords = np.asarray(edge_coords, dtype = np.float32).reshape(-1, 2, 3)
+    if len(edge_coords) == 0:
+        return []
+
+    points, inverse = np.unique(edge_coords.reshape(-1, 3), axis = 0, return_inverse = True)
+    pairs = inverse.reshape(-1, 2)
+    # 長さのない辺は除く
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+
+    degree = np.bincount(pairs.ravel(), minlength = len(points))
+    adjacency = [[] for _ in range(len(points))]
+    pair_list = pairs.tolist()
+    for edge, (a, b) in enumerate(pair_list):
+        adjacency[a].append(edge)
+        adjacency[b].append(edge)
+    used = [False] * len(pair_list)
+
+    def walk(vertex, edge):
+        chain = [vertex]
+        while True:
+            used[edge] = True
+            a, b = pair_list[edge]
+            vertex = b if a == vertex else a
+            chain.append(vertex)
+            # 分岐・端点で折れ線を区切る
+            if degree[vertex] != 2:
+                return chain
+            edge = next((e for e in adjacency[vertex] if not used[e]), None)
+            if edge is None:
+                return chain
+
+    chains = []
+    # 端点・分岐点から辿る
+    for vertex in np.flatnonzero(degree != 2).tolist():
+        for edge in adjacency[vertex]:
+            if not used[edge]:
+                chains.append(walk(vertex, edge))
+    # 残りは分岐のない輪
+    for edge, (a, _) in enumerate(pair_list):
+        if not used[edge]:
+            chains.append(walk(a, edge))
+
+    return [points[chain] for chain in chains]
+
+# 近傍点の検索用に、点を格子に分けて格子番号順に並べる（cell_size は検索する距離以上にする）
+# 戻り値は (並べ替えた点の番号, 並べ替えた格子番号, 格子の原点, 格子の大きさ, 格子の数)
+def build_point_grid(points, cell_size):
+    points = np.asarray(points, dtype = np.float64).reshape(-1, 3)
+    if len(points) == 0:
+        return np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64), np.zeros(3), cell_size, np.ones(3, dtype = np.int64)
+
+    # 格子番号が int64 に収まるよう、1軸あたりの格子の数を制限する
+    lo = points.min(axis = 0) - cell_size
+    extent = points.max(axis = 0) + cell_size - lo
+    cell_size = max(cell_size, float(extent.max()) / 2000000.0)
+    dims = np.floor(extent / cell_size).astype(np.int64) + 3
+
+    keys = get_point_grid_keys(points, lo, cell_size, dims)
+    order = np.argsort(keys, kind = 'stable')
+    return order, keys[order], lo, cell_size, dims
+
+def get_point_grid_keys(points, lo, cell_size, dims, offset = (0, 0, 0)):
+    cells = np.floor((points - lo) / cell_size).astype(np.int64) + 1 + np.asarray(offset, dtype = np.int64)
+    cells = np.clip(cells, 0, dims - 1)
+    return (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+
+# queries (Q, 3) ごとに tolerance 以内で最も近い点の番号をまとめて求める（見つからない場合は -1）
+# 候補の組み合わせに展開するため、問い合わせは chunk_size ずつ調べてメモリの使用量を抑える
+def find_nearest_points(points, point_grid, queries, tolerance, chunk_size = 1024):
+    points = np.asarray(points, dtype = np.float64).reshape(-1, 3)
+    queries = np.asarray(queries, dtype = np.float64).reshape(-1, 3)
+
+    nearest = np.full(len(queries), -1, dtype = np.int64)
+    nearest_dist = np.full(len(queries), np.inf)
+    if len(points) == 0 or len(queries) == 0:
+        return nearest
+
+    for chunk_start in range(0, len(queries), chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        nearest[chunk], nearest_dist[chunk] = find_nearest_points_chunk(points, point_grid, queries[chunk])
+
+    nearest[nearest_dist > tolerance * tolerance] = -1
+    return nearest
+
+# find_nearest_points の問い合わせの一部について、最も近い点の番号と距離の2乗を求める
+def find_nearest_points_chunk(points, point_grid, queries):
+    order, keys, lo, cell_size, dims = point_grid
+    nearest = np.full(len(queries), -1, dtype = np.int64)
+    nearest_dist = np.full(len(queries), np.inf)
+
+    # 格子の大きさは検索する距離以上のため、隣接する27個の格子のみ調べればよい
+    query_index = np.arange(len(queries))
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                query_keys = get_point_grid_keys(queries, lo, cell_size, dims, (dx, dy, dz))
+                start = np.searchsorted(keys, query_keys, side = 'left')
+                end = np.searchsorted(keys, query_keys, side = 'right')
+                counts = end - start
+                if not counts.any():
+                    continue
+
+                # 格子に含まれる点とのすべての組み合わせに展開する（問い合わせの順に並ぶ）
+                offsets = np.cumsum(counts) - counts
+                candidate_query = np.repeat(query_index, counts)
+                candidate_offset = np.arange(counts.sum()) - np.repeat(offsets, counts)
+                candidate = order[np.repeat(start, counts) + candidate_offset]
+                diff = points[candidate] - queries[candidate_query]
+                dist = np.einsum('ij,ij->i', diff, diff)
+
+                # 問い合わせごとに最も近いもの（同じ距離の場合は先の候補）を残す
+                has = counts > 0
+                best_query = query_index[has]
+                best_dist = np.minimum.reduceat(dist, offsets[has])
+                best_pos = np.flatnonzero(dist == np.repeat(best_dist, counts[has]))
+                best_pos = best_pos[np.r_[True, np.diff(candidate_query[best_pos]) != 0]]
+                best = candidate[best_pos]
+                closer = best_dist < nearest_dist[best_query]
+                nearest[best_query[closer]] = best[closer]
+                nearest_dist[best_query[closer]] = best_dist[closer]
+
+    return nearest, nearest_dist
+
+# 頂点の組 pairs (P, 2) に一致する辺の番号をまとめて求める（向きは問わない、見つからない場合は -1）
+def find_edges(edges, pairs, vertex_count):
+    edges = np.asarray(edges, dtype = np.int64).reshape(-1, 2)
+    pairs = np.asarray(pairs, dtype = np.int64).reshape(-1, 2)
+    result = np.full(len(pairs), -1, dtype = np.int64)
+    if len(edges) == 0 or len(pairs) == 0:
+        return result
+
+    edge_keys = edges.min(axis = 1) * vertex_count + edges.max(axis = 1)
+    order = np.argsort(edge_keys, kind = 'stable')
+    sorted_keys = edge_keys[order]
+    pair_keys = pairs.min(axis = 1) * vertex_count + pairs.max(axis = 1)
+    position = np.minimum(np.searchsorted(sorted_keys, pair_keys), len(sorted_keys) - 1)
+    found = sorted_keys[position] == pair_keys
+    result[found] = order[position[found]]
+    return result
@@ -0,0 +1,141 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bpy
+import blf
+
+from time import perf_counter
+
+class WireHudTarget():
+    """対象ごとの計測結果
+    """
+    def __init__(self):
+        self.vertex_count = 0
+        self.edge_count = 0
+        # 描画した辺の数（前後判定・カリング・LOD後）
+        self.drawn_count = 0
+        # 抽出結果を使いまわせたか
+        self.is_cache_hit = False
+        # バッチを作り直した理由（作り直していない場合はNone）
+        self.batch_reason = None
+        # 最後に抽出し直した理由と時間（抽出は描画と別のタイミングで行うため、最後の結果を保持する）
+        self.extract_reason = None
+        self.extract_seconds = 0.0
+        self.build_seconds = 0.0
+
+class WireHud():
+    """描画の処理時間・頂点数などを3DVIEWに表示する
+    """
+    # 描画ごとの段階別の時間
+    times = {}
+    # 対象名ごとの計測結果
+    targets = {}
+
+    @classmethod
+    def begin_frame(self):
+        self.times = {"classify": 0.0, "batch": 0.0, "draw": 0.0, "total": 0.0}
+        for target in self.targets.values():
+            target.batch_reason = None
+            target.drawn_count = 0
+
+    @classmethod
+    def get_target(self, name):
+        target = self.targets.get(name)
+        if target is None:
+            target = WireHudTarget()
+            self.targets[name] = target
+        return target
+
+    @classmethod
+    def add_time(self, stage, start):
+        """startからの経過時間を段階ごとに加算し、現在の時刻を返す
+        """
+        now = perf_counter()
+        self.times[stage] = self.times.get(stage, 0.0) + now - start
+        return now
+
+    @classmethod
+    def record_cache(self, name, reason):
+        self.get_target(name).is_cache_hit = reason is None
+
+    @classmethod
+    def record_extract(self, name, reason, extract_seconds, build_seconds = 0.0):
+        target = self.get_target(name)
+        target.extract_reason = reason
+        target.extract_seconds = extract_seconds
+        target.build_seconds = build_seconds
+
+    @classmethod
+    def record_entry(self, name, vertex_count, edge_count):
+        target = self.get_target(name)
+        target.vertex_count = vertex_count
+        target.edge_count = edge_count
+
+    @classmethod
+    def record_batch(self, name, reason, drawn_count):
+        target = self.get_target(name)
+        if reason is not None:
+            target.batch_reason = reason
+        target.drawn_count += drawn_count
+
+    @classmethod
+    def get_lines(self, names):
+        times = self.times
+        lines = [
+            "ConfirmWire  total %.2f ms" % (times.get("total", 0.0) * 1000),
+            "classify %.2f ms  batch %.2f ms  draw %.2f ms" % (
+                times.get("classify", 0.0) * 1000,
+                times.get("batch", 0.0) * 1000,
+                times.get("draw", 0.0) * 1000),
+        ]
+        for name in names:
+            target = self.targets.get(name)
+            if target is None:
+                continue
+            lines.append("%s: %d verts  %d edges  drawn %d  cache %s  batch %s" % (
+                name,
+                target.vertex_count,
+                target.edge_count,
+                target.drawn_count,
+                "hit" if target.is_cache_hit else "miss",
+                target.batch_reason or "reused"))
+            if target.extract_reason is not None:
+                lines.append("    extract %.2f ms  build %.2f ms  (%s)" % (
+                    target.extract_seconds * 1000,
+                    target.build_seconds * 1000,
+                    target.extract_reason))
+        return lines
+
+    @classmethod
+    def draw(self, names):
+        font_id = 0
+        ui_scale = bpy.context.preferences.system.ui_scale
+        line_height = int(16 * ui_scale)
+        if bpy.app.version >= (4, 0, 0):
+            blf.size(font_id, 11 * ui_scale)
+        else:
+            blf.size(font_id, int(11 * ui_scale), 72)
+        blf.color(font_id, 1.0, 1.0, 1.0, 0.9)
+
+        # 左下から上に向かって表示する
+        lines = self.get_lines(names)
+        y = line_height * len(lines)
+        for line in lines:
+            blf.position(font_id, 20 * ui_scale, y, 0)
+            blf.draw(font_id, line)
+            y -= line_height
+
+    @classmethod
+    def clear(self):
+        self.times = {}
+        self.targets = {}
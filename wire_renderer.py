@@ -0,0 +1,170 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bpy
+import gpu
+
+from .wire_core import *
+from .wire_shader import *
+
+class WireRenderer():
+    """ConfirmWireの描画で使いまわすシェーダー・頂点フォーマットと描画状態
+    """
+    # 作成済みか（バックグラウンド起動など、登録時に作成できない場合は描画時に作成する）
+    is_setup = False
+    uniform_shader = None
+    facing_shader = None
+    # 太い線用（使えないバージョンでは None）
+    polyline_shader = None
+    # 頂点フォーマット（座標のみ / 座標と法線）
+    pos_format = None
+    pos_nor_format = None
+
+    @classmethod
+    def setup(self):
+        if self.is_setup:
+            return
+
+        self.pos_format = gpu.types.GPUVertFormat()
+        self.pos_format.attr_add(id = "pos", comp_type = 'F32', len = 3, fetch_mode = 'FLOAT')
+        self.pos_nor_format = gpu.types.GPUVertFormat()
+        self.pos_nor_format.attr_add(id = "pos", comp_type = 'F32', len = 3, fetch_mode = 'FLOAT')
+        self.pos_nor_format.attr_add(id = "nor", comp_type = 'F32', len = 3, fetch_mode = 'FLOAT')
+
+        self.uniform_shader = WireShader.create_uniform_shader()
+        try:
+            self.polyline_shader = WireShader.create_polyline_shader()
+        except Exception as e:
+            print("ConfirmWire: polyline shader is not available.", e)
+            self.polyline_shader = None
+        # 作成に失敗した場合はCPUでの判定に切り替える
+        try:
+            self.facing_shader = WireShader.create_facing_shader()
+        except Exception as e:
+            print("ConfirmWire: failed to create facing shader.", e)
+            self.facing_shader = None
+        self.is_setup = True
+
+    @classmethod
+    def get_shader(self, facing_mode, line_width = 1.0):
+        """描画に使うシェーダーと、GPUで前後判定するかを返す
+        """
+        self.setup()
+        if facing_mode == 'GPU' and self.facing_shader is not None:
+            return self.facing_shader, True
+        # 太い線はドライバーの glLineWidth に任せず、ポリラインで描画する
+        if line_width > 1.0 and self.polyline_shader is not None:
+            return self.polyline_shader, False
+        return self.uniform_shader, False
+
+    @classmethod
+    def begin(self, shader, line_width):
+        if hasattr(gpu, "state"):
+            gpu.state.blend_set('ALPHA')
+            gpu.state.line_width_set(line_width)
+        else:
+            # gpu.state がないバージョン用
+            import bgl
+            bgl.glEnable(bgl.GL_BLEND)
+            bgl.glLineWidth(line_width)
+        shader.bind()
+
+        # ポリラインは線幅をシェーダー側で扱う（全対象で共通のため描画ごとに1回のみ設定する）
+        if shader is self.polyline_shader:
+            shader.uniform_float("viewportSize", self.get_viewport_size())
+            shader.uniform_float("lineWidth", line_width)
+
+    @classmethod
+    def get_viewport_size(self):
+        if hasattr(gpu, "state") and hasattr(gpu.state, "viewport_get"):
+            _, _, width, height = gpu.state.viewport_get()
+            return (width, height)
+        # 描画中の領域（オペレーター実行時のコンテキストではなく、描画しているビュー）
+        region = bpy.context.region
+        return (region.width, region.height)
+
+    @classmethod
+    def end(self):
+        if hasattr(gpu, "state"):
+            gpu.state.line_width_set(1.0)
+            gpu.state.blend_set('NONE')
+        else:
+            import bgl
+            bgl.glLineWidth(1)
+            bgl.glDisable(bgl.GL_BLEND)
+
+    @classmethod
+    def create_vert_buf(self, coords, normals = None):
+        """頂点バッファを作成する（前後の辺で共有し、形状が変わるまで転送し直さない）
+        """
+        self.setup()
+        vert_format = self.pos_nor_format if normals is not None else self.pos_format
+        vbo = gpu.types.GPUVertBuf(vert_format, len(coords))
+        vbo.attr_fill("pos", coords)
+        if normals is not None:
+            vbo.attr_fill("nor", normals)
+        return vbo
+
+    @classmethod
+    def get_vert_buf(self, entry, is_facing = False):
+        """対象の頂点バッファと、作り直したかを取得する
+        頂点の移動のみの場合は、転送済みの頂点バッファにPythonからは書き込めないため座標のみ転送し直す
+        （辺のつながりは変わらないため、インデックスのバッファはそのまま使える）
+        GPUで前後判定する場合は、辺ごとに頂点を分けて辺の法線を持たせる
+        """
+        if is_facing:
+            if entry.vbo_facing is not None and entry.vbo_facing_version == entry.geometry_version:
+                return entry.vbo_facing, False
+            entry.vbo_facing = self.create_vert_buf(*get_edge_vertex_arrays(entry.coords, entry.edges, entry.edge_normals))
+            entry.vbo_facing_version = entry.geometry_version
+            return entry.vbo_facing, True
+
+        if entry.vbo is not None and entry.vbo_version == entry.geometry_version:
+            return entry.vbo, False
+        entry.vbo = self.create_vert_buf(entry.coords)
+        entry.vbo_version = entry.geometry_version
+        return entry.vbo, True
+
+    @classmethod
+    def create_index_buf(self, indices):
+        """辺のインデックスのバッファを作成する（辺がない場合はNone）
+        """
+        if len(indices) == 0:
+            return None
+        return gpu.types.GPUIndexBuf(type = 'LINES', seq = indices)
+
+    @classmethod
+    def create_batch(self, vbo, ibo):
+        if ibo is None:
+            return None
+        return gpu.types.GPUBatch(type = 'LINES', buf = vbo, elem = ibo)
+
+    @classmethod
+    def register(self):
+        # バックグラウンド起動ではGPUが使えないため作成しない
+        if bpy.app.background:
+            return
+        # 起動直後などで作成できない場合は描画時に作成し直す
+        try:
+            self.setup()
+        except Exception:
+            self.unregister()
+
+    @classmethod
+    def unregister(self):
+        self.is_setup = False
+        self.uniform_shader = None
+        self.facing_shader = None
+        self.polyline_shader = None
+        self.pos_format = None
+        self.pos_nor_format = None
@@ -0,0 +1,96 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import bpy
+import gpu
+
+# 辺の法線（両端の頂点法線の和）と視点の向きの内積で、内側を向いた辺を破棄または薄く描画する
+# 頂点は辺ごとに分けて両端に辺の法線を持たせ、補間もしないため、辺の途中で前後が切り替わらずCPUでの判定と一致する
+FACING_VERTEX_SOURCE = '''
+void main()
+{
+    facing = dot(nor, u_ViewAxis);
+    gl_Position = u_ModelViewProjectionMatrix * vec4(pos, 1.0);
+}
+'''
+
+FACING_FRAGMENT_SOURCE = '''
+void main()
+{
+    if (facing < 0.0) {
+        if (u_BackAlpha <= 0.0) {
+            discard;
+        }
+        fragColor = vec4(u_Color.rgb, u_Color.a * u_BackAlpha);
+    }
+    else {
+        fragColor = u_Color;
+    }
+}
+'''
+
+# GPUShaderCreateInfo が使えないバージョン用の宣言
+FACING_LEGACY_VERTEX_DECLARE = '''
+uniform mat4 u_ModelViewProjectionMatrix;
+uniform vec3 u_ViewAxis;
+in vec3 pos;
+in vec3 nor;
+flat out float facing;
+'''
+
+FACING_LEGACY_FRAGMENT_DECLARE = '''
+uniform vec4 u_Color;
+uniform float u_BackAlpha;
+flat in float facing;
+out vec4 fragColor;
+'''
+
+class WireShader():
+    """ConfirmWire専用のシェーダー（作成のみ行い、保持はWireRendererで行う）
+    """
+    @classmethod
+    def create_uniform_shader(self):
+        # 3D_UNIFORM_COLOR は 3.4 以降非推奨、4.0 で削除された
+        if bpy.app.version >= (3, 4, 0):
+            return gpu.shader.from_builtin('UNIFORM_COLOR')
+        return gpu.shader.from_builtin('3D_UNIFORM_COLOR')
+
+    @classmethod
+    def create_polyline_shader(self):
+        # 太い線を三角形に展開して描画する（glLineWidth に依存しない）
+        if bpy.app.version >= (4, 0, 0):
+            return gpu.shader.from_builtin('POLYLINE_UNIFORM_COLOR')
+        return gpu.shader.from_builtin('3D_POLYLINE_UNIFORM_COLOR')
+
+    @classmethod
+    def create_facing_shader(self):
+        if not hasattr(gpu.types, "GPUShaderCreateInfo"):
+            return gpu.types.GPUShader(
+                FACING_LEGACY_VERTEX_DECLARE + FACING_VERTEX_SOURCE,
+                FACING_LEGACY_FRAGMENT_DECLARE + FACING_FRAGMENT_SOURCE)
+
+        interface = gpu.types.GPUStageInterfaceInfo("confirm_wire_facing_interface")
+        interface.flat('FLOAT', "facing")
+
+        info = gpu.types.GPUShaderCreateInfo()
+        info.push_constant('MAT4', "u_ModelViewProjectionMatrix")
+        info.push_constant('VEC4', "u_Color")
+        info.push_constant('VEC3', "u_ViewAxis")
+        info.push_constant('FLOAT', "u_BackAlpha")
+        info.vertex_in(0, 'VEC3', "pos")
+        info.vertex_in(1, 'VEC3', "nor")
+        info.vertex_out(interface)
+        info.fragment_out(0, 'VEC4', "fragColor")
+        info.vertex_source(FACING_VERTEX_SOURCE)
+        info.fragment_source(FACING_FRAGMENT_SOURCE)
+        return gpu.shader.create_from_info(info)